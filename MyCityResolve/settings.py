@@ -49,22 +49,126 @@ INSTALLED_APPS = [
     'resolve.apps.ResolveConfig',
 ]
 
+# Caches: a per-process local tier, plus an optional shared Redis tier that
+# holds entity versions and cached results for every worker. Set
+# REDIS_CACHE_URL (e.g. 'redis://127.0.0.1:6379/1') when running more than
+# one process, or invalidations won't reach the other workers.
+REDIS_CACHE_URL = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mycity-resolve',
+    },
+}
+if REDIS_CACHE_URL:
+    CACHES['shared'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_CACHE_URL,
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    }
+
+# Seconds a cached view/queryset result is kept (see resolve.caching)
+RESULT_CACHE_TIMEOUT = 300
+
 # Channels settings
 ASGI_APPLICATION = 'MyCityResolve.asgi.application'
 
-# Channel Layers Configuration (using in-memory layer for development)
+# Channel Layers Configuration (using in-memory layer for development).
+# The resolve.channel_layers backends record group sizes, send latency and
+# dropped messages in /metrics/; with Redis use
+# 'resolve.channel_layers.InstrumentedRedisChannelLayer', and set the
+# "channels_redis.core" logger to INFO in LOGGING, since channels_redis only
+# reports dropped messages in info log records.
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        'BACKEND': 'resolve.channel_layers.InstrumentedInMemoryChannelLayer'
     }
 }
 
+# Notifications pushed over websockets are coalesced per recipient and sent
+# as one frame every NOTIFICATION_PUSH_INTERVAL seconds (0 sends immediately)
+NOTIFICATION_PUSH_INTERVAL = 0.25
+
+# Likes and comments on the same issue within this many seconds are folded
+# into a single notification ("alice and 41 others liked your issue.")
+NOTIFICATION_AGGREGATION_WINDOW = 6 * 60 * 60
+
+# Read notifications older than this are moved to compressed monthly
+# archives by `manage.py archive_notifications`
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000
+NOTIFICATION_ARCHIVE_DIR = BASE_DIR / 'archive' / 'notifications'
+
+# Issues confirmed solved longer ago than this are moved out of the hot Issue
+# table into ArchivedIssue by `manage.py archive_issues`
+ISSUE_ARCHIVE_AFTER_DAYS = 180
+ISSUE_ARCHIVE_BATCH_SIZE = 200
+
+# Derived views fed from the IssueEvent outbox, run by `manage.py process_events`
+ISSUE_EVENT_CONSUMERS = [
+    'resolve.analytics.LeaderSLAConsumer',
+    'resolve.reputation.ReputationConsumer',
+    'resolve.recommendations.RecommendationConsumer',
+]
+
+# Run the consumers right after each commit instead of from process_events
+ISSUE_EVENTS_EAGER = DEBUG
+
+# Consumers only read events at least this many seconds old. On databases
+# that commit concurrently (PostgreSQL) set this to a few seconds so a
+# consumer can't move past an id whose transaction hasn't committed yet.
+ISSUE_EVENT_SETTLE_SECONDS = 0
+
+# Overrides for the citizen reputation weights in resolve.reputation
+REPUTATION_WEIGHTS = {
+    'resolved': 10,
+    'likes': 2,
+    'flags': -5,
+    'age_months': 1,
+}
+
+# "Near you" suggestions on explore: citizens and unresolved issues within
+# this radius of the hometown, active in the last ACTIVITY_DAYS, top SIZE kept
+RECOMMENDATION_RADIUS_METERS = 3000
+RECOMMENDATION_ACTIVITY_DAYS = 30
+RECOMMENDATION_SIZE = 10
+
+# Seconds a rendered leaderboard fragment is kept. Fragments are also
+# invalidated whenever the rankings change.
+LEADERBOARD_CACHE_TIMEOUT = 300
+
+# New issues within this distance of an unresolved issue with similar text
+# (estimated Jaccard similarity of their MinHash signatures) are offered as
+# duplicates on the submit form
+DUPLICATE_RADIUS_METERS = 150
+DUPLICATE_SIMILARITY_THRESHOLD = 0.3
+
+# Photos whose 64-bit difference hashes differ in at most this many bits are
+# treated as the same picture. Values above 3 lose the recall guarantee of
+# the four-band index in resolve.imagehash.
+IMAGE_DUPLICATE_MAX_DISTANCE = 3
+
+# /metrics/ is served to staff, and to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" when this is set
+METRICS_TOKEN = None
+
+# Staff requests sent with an X-Profile header or ?profile=1 are profiled by
+# resolve.profiling: seconds between stack samples, and SQL queries kept
+PROFILER_SAMPLE_INTERVAL = 0.005
+PROFILER_MAX_QUERIES = 1000
+
 MIDDLEWARE = [
+    'resolve.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'resolve.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'resolve.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,15 +177,23 @@ ROOT_URLCONF = 'MyCityResolve.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, timing renders for resolve.metrics
+        'BACKEND': 'resolve.backends.templates.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compile each template once per process, even with DEBUG on;
+            # issue cards are additionally cached per version with {% cache %}
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -92,13 +204,42 @@ WSGI_APPLICATION = 'MyCityResolve.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# The resolve.backends.sqlite3 engine puts SQLite in WAL mode and serializes
+# writes from the ASGI worker threads (see its module docstring). Use
+# 'django.db.backends.sqlite3' to go back to stock behaviour.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'resolve.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            # Seconds to wait for the writer lock and for other processes' locks
+            'timeout': 20,
+        },
+        # Reuse connections so the pragmas run once per thread, not per request
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Read replicas are extra aliases listed in REPLICA_DATABASES. To try
+    # them locally with SQLite files refreshed by `manage.py sync_replicas`:
+    # 'replica1': {
+    #     'ENGINE': 'resolve.backends.sqlite3',
+    #     'NAME': BASE_DIR / 'db.replica1.sqlite3',
+    #     'TEST': {'MIRROR': 'default'},
+    # },
 }
 
+DATABASE_ROUTERS = ['resolve.routers.ReplicaRouter']
+
+# Aliases in DATABASES holding read-only copies of 'default'. GET requests
+# read from them round-robin, skipping any that fail a health check
+REPLICA_DATABASES = []
+
+# Seconds a client reads from the primary after writing (read-your-writes)
+REPLICA_PIN_SECONDS = 5
+
+# Seconds between health checks of each replica, per process
+REPLICA_HEALTH_INTERVAL = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
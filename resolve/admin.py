@@ -1,8 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Issue, Leader, CitizenProfile
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .imagehash import find_similar_images, to_unsigned
+from .models import ArchivedIssue, Issue, Leader, CitizenProfile, RequestProfile
 from .models import ChatRoom, ChatMessage
+from .resolution import confirm_by_user, resolve_by_leader
 
 
 class IssueAdmin(admin.ModelAdmin):
@@ -10,8 +16,48 @@ class IssueAdmin(admin.ModelAdmin):
                    'is_user_confirmed', 'flag_count', 'created_at']
     list_filter = ['status', 'is_leader_resolved', 'is_user_confirmed', 'created_at']
     search_fields = ['title', 'description', 'user__username']
-    readonly_fields = ['created_at', 'updated_at']
-    list_editable = ['status', 'is_leader_resolved', 'is_user_confirmed']
+    # Status only changes through the resolution actions, which credit the
+    # leader and record the IssueEvent the consumers read
+    readonly_fields = ['status', 'is_leader_resolved', 'is_user_confirmed', 'leader_resolved_at',
+                       'user_confirmed_at', 'created_at', 'updated_at', 'similar_photos']
+    actions = ['mark_leader_resolved', 'mark_user_confirmed']
+
+    @admin.action(description='Mark selected issues resolved by their tagged leader')
+    def mark_leader_resolved(self, request, queryset):
+        resolved = sum(
+            resolve_by_leader(issue, issue.leader_tagged)
+            for issue in queryset.select_related('leader_tagged__user_account')
+        )
+        self.message_user(request, f'{resolved} issues marked resolved; issues that were not open were skipped.',
+                          messages.SUCCESS)
+
+    @admin.action(description='Confirm selected issues solved on behalf of their reporters')
+    def mark_user_confirmed(self, request, queryset):
+        confirmed = sum(confirm_by_user(issue, issue.user) for issue in queryset.select_related('user'))
+        self.message_user(request, f'{confirmed} issues confirmed solved; issues not awaiting confirmation were skipped.',
+                          messages.SUCCESS)
+
+    @admin.display(description='Similar photos')
+    def similar_photos(self, obj):
+        fingerprint = getattr(obj, 'image_fingerprint', None)
+        if fingerprint is None:
+            return '-'
+        matches = find_similar_images(to_unsigned(fingerprint.dhash), exclude_issue_id=obj.pk)
+        if not matches:
+            return 'None found'
+        titles = dict(Issue.objects.filter(pk__in=[m[0] for m in matches]).values_list('pk', 'title'))
+        return format_html('<ul>{}</ul>', format_html_join(
+            '', '<li><a href="{}">{}</a> ({} bits apart)</li>',
+            ((reverse('admin:resolve_issue_change', args=[issue_id]), titles.get(issue_id, issue_id), distance)
+             for issue_id, distance in matches)
+        ))
+
+
+class ArchivedIssueAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'leader_tagged', 'user_confirmed_at', 'archived_at']
+    list_filter = ['archived_at']
+    search_fields = ['title', 'description', 'user__username']
+    readonly_fields = ['archived_at']
 
 
 class LeaderAdmin(admin.ModelAdmin):
@@ -28,6 +74,51 @@ class CitizenProfileAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['target', 'kind', 'method', 'status_code', 'duration', 'query_count',
+                    'query_time', 'user', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['target']
+    fields = ['kind', 'target', 'method', 'status_code', 'user', 'duration', 'sample_count',
+              'flame_graph', 'query_count', 'query_time', 'sql']
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/stacks/', self.admin_site.admin_view(self.download_stacks),
+                 name='resolve_requestprofile_stacks'),
+        ] + super().get_urls()
+
+    def download_stacks(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.stacks, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{pk}.folded"'
+        return response
+
+    @admin.display(description='Flame graph')
+    def flame_graph(self, obj):
+        link = format_html(
+            '<a href="{}">Download collapsed stacks</a> (open in speedscope.app or flamegraph.pl)',
+            reverse('admin:resolve_requestprofile_stacks', args=[obj.pk])
+        )
+        if obj.kind == 'websocket':
+            # See resolve.profiling: the event loop thread isn't sampled
+            return format_html('{}<br>Websocket stacks only cover time spent in database queries.', link)
+        return link
+
+    @admin.display(description='SQL')
+    def sql(self, obj):
+        if not obj.queries:
+            return '-'
+        return format_html('<table>{}</table>', format_html_join(
+            '', '<tr><td>{} ms</td><td><code>{}</code></td></tr>',
+            ((f"{query['seconds'] * 1000:.1f}", query['sql']) for query in obj.queries)
+        ))
+
+
 # Chat admin models
 class ChatRoomAdmin(admin.ModelAdmin):
     list_display = ['name', 'is_group_chat', 'creator', 'created_at']
@@ -44,6 +135,8 @@ class ChatMessageAdmin(admin.ModelAdmin):
 
 # Register models
 admin.site.register(Issue, IssueAdmin)
+admin.site.register(ArchivedIssue, ArchivedIssueAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
 admin.site.register(Leader, LeaderAdmin)
 admin.site.register(CitizenProfile, CitizenProfileAdmin)
 admin.site.register(ChatRoom, ChatRoomAdmin)
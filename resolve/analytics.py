@@ -0,0 +1,158 @@
+import math
+
+from django.db import transaction
+from django.utils import timezone
+
+from .events import EventConsumer
+from .models import ArchivedIssue, Issue, LeaderDailyStats
+from .rankings import invalidate_leaderboard
+
+
+class LogHistogram:
+    """
+    Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins of ratio `gamma`, so any quantile
+    is returned within `relative_accuracy` of the true value, and two
+    sketches merge by adding bin counts. This lets daily rollups be
+    combined into any longer window without keeping the raw values.
+    """
+
+    def __init__(self, relative_accuracy=0.02):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, weight=1):
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + weight
+        self.count += weight
+
+    def merge(self, other):
+        for index, weight in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + weight
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or None if the sketch is empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bin in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {
+            'accuracy': self.relative_accuracy,
+            'zero': self.zero_count,
+            'count': self.count,
+            'bins': {str(index): weight for index, weight in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('accuracy', 0.02))
+        sketch.zero_count = data.get('zero', 0)
+        sketch.count = data.get('count', 0)
+        sketch.bins = {int(index): weight for index, weight in data.get('bins', {}).items()}
+        return sketch
+
+
+class LeaderSLAConsumer(EventConsumer):
+    """Maintains LeaderDailyStats from created/resolved/confirmed events"""
+    name = 'leader_sla'
+    kinds = ['created', 'resolved', 'confirmed']
+
+    def handle(self, events):
+        resolved_ids = {event.issue_id for event in events if event.kind == 'resolved'}
+        issue_created = dict(Issue.objects.filter(pk__in=resolved_ids).values_list('pk', 'created_at'))
+        # Issues archived before their events were handled, e.g. on a replay
+        # after reset(), keep their id and submission time in the archive
+        issue_created.update(
+            ArchivedIssue.objects.filter(pk__in=resolved_ids - issue_created.keys()).values_list('pk', 'created_at')
+        )
+
+        rollups = {}
+        for event in events:
+            leader_id = event.payload.get('leader_id')
+            if leader_id is None:
+                continue
+            day = timezone.localtime(event.created_at).date()
+            rollup = rollups.setdefault((leader_id, day), {
+                'opened': 0, 'resolved': 0, 'confirmed': 0, 'sketch': LogHistogram(),
+            })
+            if event.kind == 'created':
+                rollup['opened'] += 1
+            elif event.kind == 'resolved':
+                rollup['resolved'] += 1
+                if event.issue_id in issue_created:
+                    seconds = (event.created_at - issue_created[event.issue_id]).total_seconds()
+                    rollup['sketch'].add(seconds)
+            elif event.kind == 'confirmed':
+                rollup['confirmed'] += 1
+
+        for (leader_id, day), rollup in rollups.items():
+            stats, _ = LeaderDailyStats.objects.select_for_update().get_or_create(
+                leader_id=leader_id, day=day
+            )
+            stats.opened += rollup['opened']
+            stats.resolved += rollup['resolved']
+            stats.confirmed += rollup['confirmed']
+            sketch = LogHistogram.from_dict(stats.resolve_time_sketch).merge(rollup['sketch'])
+            stats.resolve_time_sketch = sketch.to_dict()
+            stats.save()
+
+        if rollups:
+            # The cached leaderboard shows these stats
+            transaction.on_commit(invalidate_leaderboard)
+
+    def reset(self):
+        LeaderDailyStats.objects.all().delete()
+
+
+def leader_sla(days=30, leader_ids=None):
+    """
+    Merge the last `days` daily rollups per leader.
+    Returns {leader_id: {'opened', 'resolved', 'confirmed', 'p50', 'p90'}}
+    with the percentiles in seconds (None when nothing was resolved).
+    """
+    since = timezone.localdate() - timezone.timedelta(days=days - 1)
+    rows = LeaderDailyStats.objects.filter(day__gte=since)
+    if leader_ids is not None:
+        rows = rows.filter(leader_id__in=leader_ids)
+
+    merged = {}
+    for stats in rows:
+        entry = merged.setdefault(stats.leader_id, {
+            'opened': 0, 'resolved': 0, 'confirmed': 0, 'sketch': LogHistogram(),
+        })
+        entry['opened'] += stats.opened
+        entry['resolved'] += stats.resolved
+        entry['confirmed'] += stats.confirmed
+        entry['sketch'].merge(LogHistogram.from_dict(stats.resolve_time_sketch))
+
+    return {
+        leader_id: {
+            'opened': entry['opened'],
+            'resolved': entry['resolved'],
+            'confirmed': entry['confirmed'],
+            'p50': entry['sketch'].quantile(0.5),
+            'p90': entry['sketch'].quantile(0.9),
+        }
+        for leader_id, entry in merged.items()
+    }
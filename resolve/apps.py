@@ -1,9 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ResolveConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resolve'
-    
+
     def ready(self):
-        import resolve.signals
\ No newline at end of file
+        from .metrics import install_query_timer
+        from .profiling import install_query_recorder
+
+        # Count and time every query towards the request being served
+        connection_created.connect(install_query_timer)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,133 @@
+"""
+SQLite backend for running under ASGI with many threads writing at once.
+
+Each connection is switched to WAL with tuned pragmas, so readers never
+block the writer or each other. Writes are funneled through one lock per
+database file in this process: an atomic block takes it at BEGIN IMMEDIATE
+and holds it until commit or rollback, and a write outside a transaction
+holds it for that statement. Threads then queue on the lock instead of
+polling SQLite's busy handler, and a transaction can never fail to upgrade
+its read snapshot to a write. Reads outside atomic blocks stay parallel.
+
+Other processes writing the same file are still arbitrated by SQLite's
+busy timeout (OPTIONS['timeout'], in seconds).
+"""
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# Applied to every new connection; OPTIONS['pragmas'] overrides entries
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable at each checkpoint rather than each commit, which is safe in WAL mode
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,           # KiB, per connection
+    'mmap_size': 128 * 1024 * 1024,
+    'wal_autocheckpoint': 1000,     # pages
+}
+
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+def writer_lock(name):
+    """The process-wide lock serializing writes to one database file"""
+    with _writer_locks_guard:
+        return _writer_locks.setdefault(str(name), threading.Lock())
+
+
+class SerializedWriteCursor(base.SQLiteCursorWrapper):
+    wrapper = None
+
+    def execute(self, query, params=None):
+        if self.wrapper.holds_writer_lock or not WRITE_STATEMENT.match(query):
+            return super().execute(query, params)
+        with self.wrapper.writing():
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        if self.wrapper.holds_writer_lock or not WRITE_STATEMENT.match(query):
+            return super().executemany(query, param_list)
+        with self.wrapper.writing():
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    holds_writer_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Only the pragmas key is ours; the rest goes to sqlite3.connect().
+        # params is a new dict, unlike OPTIONS, which every thread's wrapper
+        # shares with settings.DATABASES.
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.lock_timeout = params.get('timeout', 20)
+        # Take the write lock at BEGIN so a transaction never has to upgrade
+        # from a stale read snapshot
+        if self.transaction_mode is None:
+            self.transaction_mode = 'IMMEDIATE'
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SerializedWriteCursor)
+        cursor.wrapper = self
+        return cursor
+
+    @contextmanager
+    def writing(self):
+        """Hold the writer lock for one statement"""
+        self.acquire_writer_lock()
+        try:
+            yield
+        finally:
+            self.release_writer_lock()
+
+    def acquire_writer_lock(self):
+        lock = writer_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=self.lock_timeout):
+            raise OperationalError('database is locked (timed out waiting for the writer lock)')
+        self.holds_writer_lock = True
+
+    def release_writer_lock(self):
+        if self.holds_writer_lock:
+            self.holds_writer_lock = False
+            writer_lock(self.settings_dict['NAME']).release()
+
+    def _start_transaction_under_autocommit(self):
+        self.acquire_writer_lock()
+        try:
+            super()._start_transaction_under_autocommit()
+        except Exception:
+            self.release_writer_lock()
+            raise
+
+    def _commit(self):
+        # A failed COMMIT leaves the transaction open for the rollback that
+        # follows, so the lock is only released on success
+        result = super()._commit()
+        self.release_writer_lock()
+        return result
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self.release_writer_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self.release_writer_lock()
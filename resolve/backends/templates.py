@@ -0,0 +1,31 @@
+"""
+The Django template backend, timing every render into the current
+request's metrics (see resolve.metrics).
+"""
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend
+from django.template.backends.django import reraise
+
+from resolve.metrics import add_template_time
+
+
+class Template(backend.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            add_template_time(time.perf_counter() - started)
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,160 @@
+import functools
+import hashlib
+import logging
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import primary
+
+logger = logging.getLogger(__name__)
+
+# Entity kinds whose versions cached results can depend on
+ISSUE = 'issue'
+LEADER = 'leader'
+HASHTAG = 'hashtag'
+USER = 'user'
+LEADERBOARD = 'leaderboard'
+
+ALL = '*'
+
+_stats = Counter()
+_missing = object()
+
+
+def local_cache():
+    return caches['default']
+
+
+def shared_cache():
+    """The cache every worker sees: the Redis tier when configured, else the local one"""
+    return caches['shared'] if 'shared' in settings.CACHES else caches['default']
+
+
+def _version_key(kind, pk):
+    return f'version:{kind}:{pk}'
+
+
+def versions(*entities):
+    """
+    Current version tokens for (kind, pk) pairs, in one round trip.
+    A pk of ALL stands for "any entity of this kind".
+    """
+    keys = [_version_key(kind, pk) for kind, pk in entities]
+    if not keys:
+        return []
+    cache = shared_cache()
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex[:12] for key in keys if key not in found}
+    if missing:
+        # add() so a concurrent writer's token wins over ours
+        for key, token in missing.items():
+            cache.add(key, token, None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, '') for key in keys]
+
+
+def bump(kind, pk=None):
+    """
+    Invalidate everything cached against an entity and against its kind.
+    Call after the write has committed (see bump_on_commit).
+    """
+    tokens = {_version_key(kind, ALL): uuid.uuid4().hex[:12]}
+    if pk is not None:
+        tokens[_version_key(kind, pk)] = uuid.uuid4().hex[:12]
+    shared_cache().set_many(tokens, None)
+
+
+def bump_on_commit(kind, pk=None):
+    transaction.on_commit(lambda: bump(kind, pk))
+
+
+def attach_card_versions(issues):
+    """
+    Set `card_version` on each issue for keying its cached template
+    fragments: it changes when the issue, its author or any leader does.
+    """
+    issues = list(issues)
+    tokens = versions(
+        (LEADER, ALL),
+        *[(ISSUE, issue.pk) for issue in issues],
+        *[(USER, issue.user_id) for issue in issues]
+    )
+    leader_token, tokens = tokens[0], tokens[1:]
+    for issue, issue_token, user_token in zip(issues, tokens, tokens[len(issues):]):
+        issue.card_version = f'{issue_token}.{user_token}.{leader_token}'
+    return issues
+
+
+def make_key(name, parts=(), depends_on=()):
+    """Cache key for a named result, its arguments and the versions it depends on"""
+    raw = repr((parts, versions(*depends_on)))
+    return f'result:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_compute(name, compute, parts=(), depends_on=(), timeout=None):
+    """
+    Cached value of `compute()`. Reads the local tier first, then the
+    shared tier, and fills both on a miss.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'RESULT_CACHE_TIMEOUT', 300)
+    key = make_key(name, parts, depends_on)
+    local = local_cache()
+    shared = shared_cache()
+
+    value = local.get(key, _missing)
+    if value is _missing and shared is not local:
+        value = shared.get(key, _missing)
+        if value is not _missing:
+            local.set(key, value, timeout)
+    if value is not _missing:
+        _stats[f'{name}.hit'] += 1
+        return value
+
+    _stats[f'{name}.miss'] += 1
+    logger.debug('Cache miss for %s', name)
+    # A lagging replica would cache stale rows under the new versions
+    with primary():
+        value = compute()
+    local.set(key, value, timeout)
+    if shared is not local:
+        shared.set(key, value, timeout)
+    return value
+
+
+def cached_result(name, depends_on=(), timeout=None):
+    """
+    Decorator caching a function's return value (a list of rows, a
+    rendered fragment) under its arguments and the versions in
+    `depends_on`. Entries may be callables taking the same arguments and
+    returning a (kind, pk) pair, for results tied to one entity.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            entities = [
+                entity(*args, **kwargs) if callable(entity) else entity
+                for entity in depends_on
+            ]
+            return get_or_compute(
+                name, lambda: func(*args, **kwargs),
+                parts=(args, sorted(kwargs.items())),
+                depends_on=entities,
+                timeout=timeout
+            )
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """{name: {'hits', 'misses'}} for this process since startup"""
+    stats = {}
+    for key, count in _stats.items():
+        name, outcome = key.rsplit('.', 1)
+        entry = stats.setdefault(name, {'hits': 0, 'misses': 0})
+        entry['hits' if outcome == 'hit' else 'misses'] = count
+    return stats
@@ -0,0 +1,91 @@
+"""
+Channel layers recording group fan-out in resolve.metrics: the number of
+channels in a group at each group_send, how long the send took, and how
+many copies were dropped because a member's channel was at capacity.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from channels.exceptions import ChannelFull
+from channels.layers import InMemoryChannelLayer
+
+from .metrics import group_dropped, group_kind, group_send_time, group_size
+
+try:
+    from channels_redis.core import RedisChannelLayer
+except ImportError:
+    RedisChannelLayer = None
+
+_dropped = ContextVar('dropped', default=None)
+
+
+class InstrumentedInMemoryChannelLayer(InMemoryChannelLayer):
+    async def group_send(self, group, message):
+        # InMemoryChannelLayer.group_send, counting ChannelFull instead of ignoring it
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        self._clean_expired()
+
+        kind = group_kind(group)
+        started = time.perf_counter()
+        channels = list(self.groups.get(group, ()))
+        results = await asyncio.gather(
+            *(self.send(channel, message) for channel in channels),
+            return_exceptions=True
+        )
+        group_send_time.observe(time.perf_counter() - started, kind)
+        group_size.observe(len(channels), kind)
+
+        dropped = 0
+        for result in results:
+            if isinstance(result, ChannelFull):
+                dropped += 1
+            elif isinstance(result, BaseException):
+                raise result
+        if dropped:
+            group_dropped.inc(kind, amount=dropped)
+
+
+class _CountOverCapacity(logging.Filter):
+    """
+    RedisChannelLayer.group_send only reports channels over capacity in an
+    info log record; add its count to the send in progress. Filters only see
+    records at enabled levels, so the "channels_redis.core" logger must be
+    set to INFO for drops to be counted.
+    """
+    def filter(self, record):
+        dropped = _dropped.get()
+        if (
+            dropped is not None
+            and isinstance(record.msg, str)
+            and record.msg.endswith('channels over capacity in group %s')
+        ):
+            dropped[0] += record.args[0]
+        return True
+
+
+if RedisChannelLayer is not None:
+    class InstrumentedRedisChannelLayer(RedisChannelLayer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            logger = logging.getLogger('channels_redis.core')
+            if not any(isinstance(f, _CountOverCapacity) for f in logger.filters):
+                logger.addFilter(_CountOverCapacity())
+
+        async def group_send(self, group, message):
+            kind = group_kind(group)
+            connection = self.connection(self.consistent_hash(group))
+            size = await connection.zcard(self._group_key(group))
+            dropped = [0]
+            token = _dropped.set(dropped)
+            started = time.perf_counter()
+            try:
+                await super().group_send(group, message)
+            finally:
+                _dropped.reset(token)
+            group_send_time.observe(time.perf_counter() - started, kind)
+            group_size.observe(size, kind)
+            if dropped[0]:
+                group_dropped.inc(kind, amount=dropped[0])
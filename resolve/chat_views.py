@@ -6,8 +6,10 @@ from django.db.models import Q
 import json
 
 from .models import ChatRoom, ChatMessage, User
+from .conditional import chat_list_etag, conditional_page
 
 @login_required
+@conditional_page(chat_list_etag)
 def chat_list(request):
     """Display list of chat rooms for the current user"""
     chat_rooms = ChatRoom.objects.filter(
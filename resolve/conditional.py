@@ -0,0 +1,99 @@
+import hashlib
+from datetime import datetime, time
+
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .caching import ALL, HASHTAG, ISSUE, LEADER, LEADERBOARD, USER, versions
+from .models import ChatRoom, EventCursor, NotificationCounter, Recommendation
+
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def _viewer(request):
+    """
+    Who the page is rendered for, or None when it can't be validated: a
+    queued flash message must be rendered, so it can't be answered with 304.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    return request.user.pk if request.user.is_authenticated else 0
+
+
+def conditional_page(etag_func):
+    """
+    Answer GETs with 304 when `etag_func` matches If-None-Match. Pages are
+    per viewer, so shared caches must not store them and browsers must
+    revalidate every time.
+    """
+    def decorator(view):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag_func)(view))
+    return decorator
+
+
+def issue_feed_etag(request):
+    viewer = _viewer(request)
+    if viewer is None:
+        return None
+    # The viewer's version covers a hometown change reordering the feed
+    return _etag('feed', viewer, versions((ISSUE, ALL), (LEADER, ALL), (USER, viewer)))
+
+
+def leaderboard_etag(request):
+    viewer = _viewer(request)
+    if viewer is None:
+        return None
+    # Week and month windows and the SLA window move with the date
+    return _etag(
+        'leaderboard', viewer, request.GET.get('period'), timezone.localdate(),
+        versions((LEADERBOARD, ALL), (LEADER, ALL))
+    )
+
+
+def explore_etag(request):
+    viewer = _viewer(request)
+    if viewer is None:
+        return None
+    # Suggestions are precomputed rows; follows bump the viewer's version
+    computed_at = Recommendation.objects.filter(profile__user_id=viewer).values_list(
+        'computed_at', flat=True
+    ).first() if viewer else None
+    return _etag(
+        'explore', viewer, request.GET.get('q'), computed_at,
+        versions((ISSUE, ALL), (HASHTAG, ALL), (USER, ALL))
+    )
+
+
+def chat_list_etag(request):
+    viewer = _viewer(request)
+    if viewer is None:
+        return None
+    rooms = ChatRoom.objects.filter(participants=viewer).aggregate(
+        rooms=Count('id', distinct=True),
+        room_updated=Max('updated_at'),
+        last_message=Max('messages__id')
+    )
+    # The new-chat picker lists every other user
+    return _etag('chat_list', viewer, sorted(rooms.items()), versions((USER, ALL)))
+
+
+def leader_sla_last_modified(request):
+    """When the SLA rollups last advanced, or midnight if the window slid since"""
+    updated = EventCursor.objects.filter(name='leader_sla').values_list('updated_at', flat=True).first()
+    if updated is None:
+        return None
+    midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(updated, midnight)
+
+
+def unread_count_last_modified(request):
+    if not request.user.is_authenticated:
+        return None
+    return NotificationCounter.objects.filter(user=request.user).values_list(
+        'updated_at', flat=True
+    ).first()
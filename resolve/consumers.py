@@ -2,18 +2,23 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
-from .models import Issue, Comment, Notification
+from django.db import transaction
+from .metrics import InstrumentedConsumer
+from .profiling import ProfiledConsumer
+from .models import Issue, Comment
+from .events import record_event
+from .notifications import mark_read, notification_group_name, notify, unread_count
 
 User = get_user_model()
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(InstrumentedConsumer, ProfiledConsumer, AsyncWebsocketConsumer):
     async def connect(self):
         if self.scope["user"].is_anonymous:
             await self.close()
             return
 
         self.user = self.scope["user"]
-        self.notification_group_name = f'notifications_{self.user.id}'
+        self.notification_group_name = notification_group_name(self.user.id)
 
         # Join notification group
         await self.channel_layer.group_add(
@@ -30,36 +35,75 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         )
 
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        action = text_data_json.get('action')
+        try:
+            text_data_json = json.loads(text_data)
+            action = text_data_json.get('action')
+        except (ValueError, AttributeError):
+            # Not a JSON object; ignore the frame rather than drop the socket
+            return
         
         if action == 'mark_read':
             notification_id = text_data_json.get('notification_id')
-            await self.mark_notification_read(notification_id)
+            if notification_id is None:
+                # Marking everything read is the separate mark_all_read action
+                await self.send(text_data=json.dumps({
+                    'action': 'error',
+                    'error': 'notification_id is required'
+                }))
+                return
+            try:
+                notification_id = int(notification_id)
+            except (TypeError, ValueError):
+                return
+            await self.mark_notifications_read(notification_id=notification_id)
             
             await self.send(text_data=json.dumps({
                 'action': 'notification_marked_read',
-                'notification_id': notification_id
+                'notification_id': notification_id,
+                'unread_count': await self.get_unread_count()
+            }))
+        elif action == 'mark_all_read':
+            up_to_id = text_data_json.get('up_to_id')
+            if up_to_id is not None:
+                try:
+                    up_to_id = int(up_to_id)
+                except (TypeError, ValueError):
+                    return
+            marked = await self.mark_notifications_read(up_to_id=up_to_id)
+
+            await self.send(text_data=json.dumps({
+                'action': 'notifications_marked_read',
+                'up_to_id': up_to_id,
+                'marked': marked,
+                'unread_count': await self.get_unread_count()
+            }))
+        elif action == 'unread_count':
+            await self.send(text_data=json.dumps({
+                'action': 'unread_count',
+                'unread_count': await self.get_unread_count()
             }))
 
     async def notification_message(self, event):
         """Handle notification messages from other consumers"""
         await self.send(text_data=json.dumps(event))
 
+    async def notification_batch(self, event):
+        """Deliver a coalesced batch of notifications as a single frame"""
+        await self.send(text_data=json.dumps({
+            'action': 'new_notifications',
+            'notifications': event['notifications']
+        }))
+
     @database_sync_to_async
-    def mark_notification_read(self, notification_id):
-        try:
-            notification = Notification.objects.get(
-                id=notification_id, recipient=self.user
-            )
-            notification.read = True
-            notification.save()
-            return True
-        except Notification.DoesNotExist:
-            return False
+    def mark_notifications_read(self, notification_id=None, up_to_id=None):
+        return mark_read(self.user, notification_id=notification_id, up_to_id=up_to_id)
+
+    @database_sync_to_async
+    def get_unread_count(self):
+        return unread_count(self.user)
 
 
-class IssueConsumer(AsyncWebsocketConsumer):
+class IssueConsumer(InstrumentedConsumer, ProfiledConsumer, AsyncWebsocketConsumer):
     async def connect(self):
         self.issue_id = self.scope['url_route']['kwargs']['issue_id']
         self.issue_group_name = f'issue_{self.issue_id}'
@@ -96,22 +140,24 @@ class IssueConsumer(AsyncWebsocketConsumer):
         issue = Issue.objects.get(id=self.issue_id)
         user = self.scope["user"]
         
-        comment = Comment.objects.create(
-            issue=issue,
-            user=user,
-            content=data.get('content')
-        )
-        
-        # Create notification for issue owner
-        if user != issue.user:
-            Notification.objects.create(
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                issue=issue,
+                user=user,
+                content=data.get('content')
+            )
+            
+            # Create notification for issue owner
+            notify(
                 recipient=issue.user,
                 sender=user,
                 notification_type='comment',
                 issue=issue,
                 comment=comment,
-                text=f"{user.username} commented on your issue."
+                verb='commented on your issue'
             )
+            record_event('commented', issue, actor=user,
+                         owner_id=issue.user_id, comment_id=comment.id)
         
         return {
             'type': 'issue_update',
@@ -127,22 +173,24 @@ class IssueConsumer(AsyncWebsocketConsumer):
         issue = Issue.objects.get(id=self.issue_id)
         user = self.scope["user"]
         
-        if issue.likes.filter(id=user.id).exists():
-            issue.likes.remove(user)
-            liked = False
-        else:
-            issue.likes.add(user)
-            liked = True
-            
-            # Create notification for issue owner
-            if user != issue.user:
-                Notification.objects.create(
+        with transaction.atomic():
+            if issue.likes.filter(id=user.id).exists():
+                issue.likes.remove(user)
+                liked = False
+            else:
+                issue.likes.add(user)
+                liked = True
+                
+                # Create notification for issue owner
+                notify(
                     recipient=issue.user,
                     sender=user,
                     notification_type='like',
                     issue=issue,
-                    text=f"{user.username} liked your issue."
+                    verb='liked your issue'
                 )
+            record_event('liked' if liked else 'unliked', issue, actor=user,
+                         owner_id=issue.user_id)
         
         return {
             'type': 'issue_update',
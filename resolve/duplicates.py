@@ -0,0 +1,95 @@
+import hashlib
+import re
+import struct
+
+from django.conf import settings
+
+from . import geo
+
+SIGNATURE_SIZE = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed (a, b) pairs for the universal hash family (a * x + b) mod p. They
+# must never change, or stored signatures stop being comparable.
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME,
+    )
+    for i in range(SIGNATURE_SIZE)
+]
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'any', 'can', 'her', 'was',
+    'one', 'our', 'out', 'has', 'have', 'had', 'its', 'this', 'that', 'with', 'from',
+    'there', 'near', 'very', 'been', 'being', 'into', 'they', 'them', 'their', 'which',
+}
+
+
+def shingles(text):
+    """Word unigrams and bigrams of the normalized text, ignoring stop words"""
+    words = [
+        word for word in re.findall(r'\w+', text.lower())
+        if len(word) > 2 and word not in STOP_WORDS
+    ]
+    return set(words) | {f'{a} {b}' for a, b in zip(words, words[1:])}
+
+
+def text_signature(text):
+    """MinHash signature of a text, packed as SIGNATURE_SIZE unsigned 32-bit ints"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return struct.pack(f'<{SIGNATURE_SIZE}I', *([_MAX_HASH] * SIGNATURE_SIZE))
+
+    signature = [
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+    return struct.pack(f'<{SIGNATURE_SIZE}I', *signature)
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    if not signature_a or not signature_b:
+        return 0.0
+    a = struct.unpack(f'<{SIGNATURE_SIZE}I', bytes(signature_a))
+    b = struct.unpack(f'<{SIGNATURE_SIZE}I', bytes(signature_b))
+    return sum(1 for x, y in zip(a, b) if x == y and x != _MAX_HASH) / SIGNATURE_SIZE
+
+
+def find_duplicates(title, description, latitude, longitude, exclude_id=None, limit=5):
+    """
+    Unresolved issues near a point whose text looks like the given one.
+
+    Candidates come from the indexed geo_cell column, so only issues in the
+    few grid cells around the point are read. Returns a list of
+    (issue, distance_meters, similarity), most similar first.
+    """
+    from .models import Issue
+
+    radius = getattr(settings, 'DUPLICATE_RADIUS_METERS', 150)
+    threshold = getattr(settings, 'DUPLICATE_SIMILARITY_THRESHOLD', 0.3)
+    signature = text_signature(f'{title} {description}')
+
+    candidates = Issue.objects.filter(
+        geo_cell__in=geo.cells_within(latitude, longitude, radius),
+        status__in=['open', 'pending_confirm']
+    ).only('id', 'title', 'latitude', 'longitude', 'text_signature', 'status', 'created_at')
+    if exclude_id is not None:
+        candidates = candidates.exclude(pk=exclude_id)
+
+    matches = []
+    for issue in candidates:
+        distance = geo.distance_meters(latitude, longitude, issue.latitude, issue.longitude)
+        if distance > radius:
+            continue
+        score = similarity(signature, issue.text_signature)
+        if score >= threshold:
+            matches.append((issue, distance, score))
+
+    matches.sort(key=lambda match: (-match[2], match[1]))
+    return matches[:limit]
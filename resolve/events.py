@@ -0,0 +1,127 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .caching import ISSUE, bump_on_commit
+from .models import EventCursor, IssueEvent
+
+logger = logging.getLogger(__name__)
+
+
+def record_event(kind, issue, actor=None, **payload):
+    """
+    Append an event to the outbox. Call this inside the transaction that
+    makes the change, so the event exists if and only if the change does.
+    """
+    event = IssueEvent.objects.create(
+        kind=kind,
+        issue_id=issue.pk,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        payload=payload
+    )
+    # Every issue state change passes through here, including the ones
+    # made with UPDATE queries that send no post_save
+    bump_on_commit(ISSUE, issue.pk)
+    if getattr(settings, 'ISSUE_EVENTS_EAGER', False):
+        transaction.on_commit(run_consumers)
+    return event
+
+
+class CursorConflict(Exception):
+    """Another worker advanced the consumer's cursor first"""
+
+
+class EventConsumer:
+    """
+    Base class for derived views fed from the IssueEvent log.
+
+    Subclasses set `name` (the cursor key) and optionally `kinds`, and
+    implement `handle(events)`. Each batch is handled in the same
+    transaction that advances the cursor, so database projections see
+    every event exactly once. Implement `reset()` to clear derived state
+    so the consumer can be rebuilt from the start of the log.
+    """
+    name = None
+    kinds = None
+
+    def handle(self, events):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+
+def get_consumers():
+    """Instantiate the consumers listed in ISSUE_EVENT_CONSUMERS"""
+    return [
+        import_string(path)()
+        for path in getattr(settings, 'ISSUE_EVENT_CONSUMERS', [])
+    ]
+
+
+def pending_events(position, batch_size, kinds=None):
+    """Events after `position`, oldest first"""
+    events = IssueEvent.objects.filter(pk__gt=position)
+    if kinds:
+        events = events.filter(kind__in=kinds)
+    settle_seconds = getattr(settings, 'ISSUE_EVENT_SETTLE_SECONDS', 0)
+    if settle_seconds:
+        # Leave room for transactions that took an earlier id but haven't committed yet
+        events = events.filter(
+            created_at__lt=timezone.now() - timezone.timedelta(seconds=settle_seconds)
+        )
+    return list(events.order_by('pk')[:batch_size])
+
+
+def process_batch(consumer, batch_size=500):
+    """Feed one batch to a consumer and advance its cursor. Returns the batch size."""
+    with transaction.atomic():
+        cursor, _ = EventCursor.objects.get_or_create(name=consumer.name)
+        events = pending_events(cursor.position, batch_size, consumer.kinds)
+        if not events:
+            return 0
+
+        consumer.handle(events)
+
+        # Optimistic lock: if another worker moved the cursor, roll this batch back
+        advanced = EventCursor.objects.filter(
+            pk=cursor.pk, position=cursor.position
+        ).update(position=events[-1].pk, updated_at=timezone.now())
+        if not advanced:
+            raise CursorConflict(consumer.name)
+    return len(events)
+
+
+def run_consumer(consumer, batch_size=500, max_batches=None):
+    """Catch a consumer up with the log. Returns the number of events handled."""
+    handled = batches = 0
+    while max_batches is None or batches < max_batches:
+        try:
+            count = process_batch(consumer, batch_size)
+        except CursorConflict:
+            logger.info('Consumer %s is being run elsewhere, stopping', consumer.name)
+            break
+        if not count:
+            break
+        handled += count
+        batches += 1
+    return handled
+
+
+def rebuild_consumer(consumer, batch_size=500):
+    """Clear a consumer's derived state and replay the whole log into it"""
+    with transaction.atomic():
+        consumer.reset()
+        EventCursor.objects.update_or_create(name=consumer.name, defaults={'position': 0})
+    return run_consumer(consumer, batch_size)
+
+
+def run_consumers(batch_size=500):
+    """Catch every configured consumer up with the log"""
+    return {
+        consumer.name: run_consumer(consumer, batch_size)
+        for consumer in get_consumers()
+    }
@@ -0,0 +1,63 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .caching import USER, bump_on_commit
+from .models import CitizenProfile, Follow
+from .recommendations import mark_stale_follow_graph
+
+
+def _invalidate(follower, followee):
+    # The counters move with UPDATE queries, which send no post_save
+    bump_on_commit(USER, follower.user_id)
+    bump_on_commit(USER, followee.user_id)
+
+
+def follow(follower, followee):
+    """
+    Make `follower` follow `followee`. The unique index on Follow rejects
+    repeats, so the counters only move when a row was really added.
+    Returns True if this call created the follow.
+    """
+    if follower.pk == followee.pk:
+        return False
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Follow.objects.create(follower=follower, followee=followee)
+        except IntegrityError:
+            return False
+        CitizenProfile.objects.filter(pk=followee.pk).update(followers_total=F('followers_total') + 1)
+        CitizenProfile.objects.filter(pk=follower.pk).update(following_total=F('following_total') + 1)
+        mark_stale_follow_graph(follower)
+        _invalidate(follower, followee)
+    return True
+
+
+def unfollow(follower, followee):
+    """Remove a follow. Returns True if there was one to remove."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(follower=follower, followee=followee).delete()
+        if deleted:
+            CitizenProfile.objects.filter(pk=followee.pk).update(followers_total=F('followers_total') - 1)
+            CitizenProfile.objects.filter(pk=follower.pk).update(following_total=F('following_total') - 1)
+            mark_stale_follow_graph(follower)
+            _invalidate(follower, followee)
+    return bool(deleted)
+
+
+def followed_ids(follower, profile_ids):
+    """Which of `profile_ids` the follower follows, in one indexed query"""
+    if follower is None:
+        return set()
+    return set(
+        Follow.objects.filter(follower=follower, followee_id__in=profile_ids)
+        .values_list('followee_id', flat=True)
+    )
+
+
+def annotate_followed(follower, profiles):
+    """Set `is_followed` on each profile in a list for rendering"""
+    followed = followed_ids(follower, [profile.pk for profile in profiles])
+    for profile in profiles:
+        profile.is_followed = profile.pk in followed
+    return profiles
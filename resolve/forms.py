@@ -37,6 +37,13 @@ class IssueForm(forms.ModelForm):
         self.fields['leader_tagged'].empty_label = "Select a leader to tag"
 
 
+class LocationForm(forms.Form):
+    """Map coordinates posted alongside an issue"""
+    # FloatField also rejects nan and inf, which float() accepts
+    latitude = forms.FloatField(min_value=-90, max_value=90)
+    longitude = forms.FloatField(min_value=-180, max_value=180)
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
@@ -111,8 +118,8 @@ class SignupForm(UserCreationForm):
         'placeholder': 'Your website (optional)'
     }))
     hometown_name = forms.CharField(widget=forms.HiddenInput())
-    hometown_latitude = forms.DecimalField(max_digits=22, decimal_places=16, widget=forms.HiddenInput())
-    hometown_longitude = forms.DecimalField(max_digits=22, decimal_places=16, widget=forms.HiddenInput())
+    hometown_latitude = forms.FloatField(min_value=-90, max_value=90, widget=forms.HiddenInput())
+    hometown_longitude = forms.FloatField(min_value=-180, max_value=180, widget=forms.HiddenInput())
 
     class Meta:
         model = User
@@ -0,0 +1,59 @@
+import math
+
+# Grid used for the indexed geo_cell columns. Changing it requires
+# recomputing every stored cell, so it is a constant rather than a setting.
+CELL_SIZE_DEGREES = 0.01
+GRID_COLUMNS = math.ceil(360 / CELL_SIZE_DEGREES)
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE_LATITUDE = 111320
+
+
+def _row_col(latitude, longitude):
+    row = int(math.floor((float(latitude) + 90) / CELL_SIZE_DEGREES))
+    col = int(math.floor((float(longitude) + 180) / CELL_SIZE_DEGREES)) % GRID_COLUMNS
+    return row, col
+
+
+def cell_id(latitude, longitude):
+    """Integer id of the ~1km grid cell containing a point"""
+    if latitude is None or longitude is None:
+        return None
+    row, col = _row_col(latitude, longitude)
+    return row * GRID_COLUMNS + col
+
+
+def cell_center(cell):
+    """(latitude, longitude) of the middle of a grid cell"""
+    row, col = divmod(cell, GRID_COLUMNS)
+    return (
+        (row + 0.5) * CELL_SIZE_DEGREES - 90,
+        (col + 0.5) * CELL_SIZE_DEGREES - 180,
+    )
+
+
+def cells_within(latitude, longitude, radius_meters):
+    """Ids of every grid cell intersecting the box of `radius_meters` around a point"""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_delta = radius_meters / METERS_PER_DEGREE_LATITUDE
+    # Longitude degrees shrink towards the poles
+    lon_delta = radius_meters / (
+        METERS_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01)
+    )
+
+    min_row, min_col = _row_col(latitude - lat_delta, longitude - lon_delta)
+    max_row, max_col = _row_col(latitude + lat_delta, longitude + lon_delta)
+    if max_col < min_col:
+        # The box crosses the antimeridian
+        cols = list(range(min_col, GRID_COLUMNS)) + list(range(0, max_col + 1))
+    else:
+        cols = list(range(min_col, max_col + 1))
+    return [row * GRID_COLUMNS + col for row in range(min_row, max_row + 1) for col in cols]
+
+
+def distance_meters(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, map(float, (lat1, lon1, lat2, lon2)))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image
+
+from .models import ImageFingerprint
+
+HASH_BITS = 64
+BAND_BITS = 16
+BAND_COUNT = HASH_BITS // BAND_BITS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def dhash(image_file):
+    """
+    64-bit difference hash of an image.
+
+    The image is shrunk to 9x8 greyscale and each bit records whether a
+    pixel is brighter than its right-hand neighbour, so re-encoding,
+    resizing and small edits change only a few bits.
+    """
+    with Image.open(image_file) as image:
+        pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def bands(value):
+    """Split a 64-bit hash into BAND_COUNT 16-bit integers"""
+    return [(value >> (BAND_BITS * i)) & BAND_MASK for i in range(BAND_COUNT)]
+
+
+def to_signed(value):
+    """Map an unsigned 64-bit hash onto the signed range a BigIntegerField stores"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+def hamming_distance(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count('1')
+
+
+def save_fingerprint(issue, value):
+    """Store the hash of an issue's photo"""
+    band_values = bands(value)
+    ImageFingerprint.objects.update_or_create(
+        issue=issue,
+        defaults={
+            'dhash': to_signed(value),
+            **{f'band{i}': band for i, band in enumerate(band_values)},
+        }
+    )
+
+
+def fingerprint_issue(issue):
+    """Hash an issue's stored photo. Returns the hash, or None if there is no readable image."""
+    if not issue.image:
+        return None
+    try:
+        with issue.image.open('rb') as image_file:
+            value = dhash(image_file)
+    except (OSError, ValueError):
+        return None
+    save_fingerprint(issue, value)
+    return value
+
+
+def find_similar_images(value, max_distance=None, exclude_issue_id=None, limit=10):
+    """
+    Issues whose photo hash is within `max_distance` bits of `value`.
+
+    Multi-index hashing: if two hashes differ in at most BAND_COUNT - 1
+    bits, at least one of their four 16-bit bands is identical. So only
+    rows matching a band exactly are fetched through the band indexes, and
+    the full Hamming distance is checked only for those. Returns a list of
+    (issue_id, distance), closest first.
+    """
+    if max_distance is None:
+        max_distance = getattr(settings, 'IMAGE_DUPLICATE_MAX_DISTANCE', BAND_COUNT - 1)
+
+    band_match = Q()
+    for i, band in enumerate(bands(value)):
+        band_match |= Q(**{f'band{i}': band})
+    candidates = ImageFingerprint.objects.filter(band_match)
+    if exclude_issue_id is not None:
+        candidates = candidates.exclude(issue_id=exclude_issue_id)
+
+    matches = []
+    for issue_id, stored in candidates.values_list('issue_id', 'dhash'):
+        distance = hamming_distance(value, stored)
+        if distance <= max_distance:
+            matches.append((issue_id, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches[:limit]
@@ -0,0 +1,115 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ArchivedIssue, Comment, Issue, Notification
+from .retention import ArchiveProgress
+
+ARCHIVE_FIELDS = [
+    'id', 'title', 'description', 'user_id', 'leader_tagged_id', 'latitude', 'longitude',
+    'geo_cell', 'flag_count', 'leader_resolved_at', 'user_confirmed_at', 'created_at', 'updated_at',
+]
+# Many-to-many relations copied row for row into the archive's own tables
+ARCHIVE_LINKS = ['hashtags', 'likes', 'bookmarks']
+
+
+def comment_snapshot(comment):
+    """A comment as stored in ArchivedIssue.comments"""
+    return {
+        'id': comment.id,
+        'user_id': comment.user_id,
+        'username': comment.user.username,
+        'content': comment.content,
+        'created_at': comment.created_at.isoformat(),
+        'parent_id': comment.parent_id,
+    }
+
+
+def _copy_links(name, issue_ids):
+    """Copy one many-to-many relation of the issues to their archived copies"""
+    hot = Issue._meta.get_field(name)
+    cold = ArchivedIssue._meta.get_field(name)
+    rows = hot.remote_field.through.objects.filter(
+        **{f'{hot.m2m_field_name()}_id__in': issue_ids}
+    ).values_list(f'{hot.m2m_field_name()}_id', f'{hot.m2m_reverse_field_name()}_id')
+    through = cold.remote_field.through
+    through.objects.bulk_create([
+        through(**{
+            f'{cold.m2m_field_name()}_id': issue_id,
+            f'{cold.m2m_reverse_field_name()}_id': target_id,
+        })
+        for issue_id, target_id in rows
+    ])
+
+
+def _archive_batch(issues):
+    ids = [issue.pk for issue in issues]
+    comments = defaultdict(list)
+    for comment in Comment.objects.filter(issue_id__in=ids).select_related('user').order_by('created_at', 'pk'):
+        comments[comment.issue_id].append(comment_snapshot(comment))
+
+    ArchivedIssue.objects.bulk_create([
+        ArchivedIssue(
+            **{field: getattr(issue, field) for field in ARCHIVE_FIELDS},
+            image=issue.image.name or None,
+            comments=comments[issue.pk],
+        )
+        for issue in issues
+    ])
+    for name in ARCHIVE_LINKS:
+        _copy_links(name, ids)
+
+    # Notifications outlive the issue, with their text and a link to the
+    # archived copy, rather than being cascade-deleted behind the unread
+    # counters' back
+    Notification.objects.filter(comment__issue_id__in=ids).update(comment=None)
+    Notification.objects.filter(issue_id__in=ids).update(archived_issue_id=F('issue_id'), issue=None)
+    Issue.objects.filter(pk__in=ids).delete()
+
+
+def archive_solved_issues(older_than_days=None, batch_size=None, max_batches=None,
+                          pause=0, progress_callback=None):
+    """
+    Move issues confirmed solved more than `older_than_days` ago (or last
+    updated then, when the confirmation time wasn't recorded) out of the
+    hot Issue table into ArchivedIssue.
+
+    Each batch of `batch_size` issues is one transaction: copy the issues,
+    their hashtags, likes, bookmarks and comments, then delete the hot rows
+    (which cascades to comments, flags and fingerprints).
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ISSUE_ARCHIVE_AFTER_DAYS', 180)
+    batch_size = batch_size or getattr(settings, 'ISSUE_ARCHIVE_BATCH_SIZE', 200)
+    cutoff = timezone.now() - timezone.timedelta(days=older_than_days)
+    # Issues solved before user_confirmed_at existed have it NULL; their last
+    # update is when they were solved, or later
+    solved_before_cutoff = Q(user_confirmed_at__lt=cutoff) | Q(user_confirmed_at__isnull=True, updated_at__lt=cutoff)
+    progress = ArchiveProgress()
+    last_id = 0
+
+    while max_batches is None or progress.batches < max_batches:
+        with transaction.atomic():
+            issues = list(
+                Issue.objects.select_for_update()
+                .filter(solved_before_cutoff, status='solved', pk__gt=last_id)
+                .order_by('pk')[:batch_size]
+            )
+            if not issues:
+                break
+            _archive_batch(issues)
+
+        last_id = issues[-1].pk
+        progress.batches += 1
+        progress.archived += len(issues)
+        if progress_callback:
+            progress_callback(progress)
+        if pause:
+            # Give other writers a turn at the database between batches
+            time.sleep(pause)
+
+    return progress
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from resolve.issue_archive import archive_solved_issues
+
+
+class Command(BaseCommand):
+    help = 'Move issues solved longer ago than the archive period out of the hot Issue table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive issues confirmed solved more than this many days ago')
+        parser.add_argument('--batch-size', type=int, help='Issues moved per transaction')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        progress = archive_solved_issues(
+            older_than_days=options['days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+            progress_callback=self.report_batch,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {progress.archived} issues in {progress.batches} batches '
+            f'({progress.elapsed:.1f}s, {progress.rate:.0f} issues/s)'
+        ))
+
+    def report_batch(self, progress):
+        self.stdout.write(
+            f'Batch {progress.batches}: {progress.archived} archived so far, '
+            f'{progress.rate:.0f} issues/s'
+        )
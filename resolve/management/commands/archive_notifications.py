@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resolve.retention import archive_notifications
+
+
+class Command(BaseCommand):
+    help = 'Archive read notifications older than the retention period and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive read notifications older than this many days')
+        parser.add_argument('--batch-size', type=int, help='Rows archived and deleted per transaction')
+        parser.add_argument('--archive-dir', help='Directory for the monthly .ndjson.gz files')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches')
+        parser.add_argument('--every', type=int,
+                            help='Keep running, starting a new pass every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            progress = archive_notifications(
+                older_than_days=options['days'],
+                batch_size=options['batch_size'],
+                archive_dir=options['archive_dir'],
+                max_batches=options['max_batches'],
+                pause=options['pause'],
+                progress_callback=self.report_batch,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived {progress.archived} notifications in {progress.batches} batches '
+                f'({progress.elapsed:.1f}s, {progress.rate:.0f} rows/s) '
+                f'into {len(progress.files)} files'
+            ))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def report_batch(self, progress):
+        self.stdout.write(
+            f'Batch {progress.batches}: {progress.archived} archived so far, '
+            f'{progress.rate:.0f} rows/s'
+        )
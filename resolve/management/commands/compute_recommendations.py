@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from resolve.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute "near you" recommendations for citizens whose neighborhood changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute for every citizen with a hometown')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        computed = refresh_recommendations(full=options['all'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Computed recommendations for {computed} citizens'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from resolve.reputation import update_reputation
+
+
+class Command(BaseCommand):
+    help = 'Recompute reputation scores for every citizen profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Profiles scored and written per batch')
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rescore this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        updated = update_reputation(options['user_ids'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} profiles'))
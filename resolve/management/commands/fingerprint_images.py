@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from resolve.imagehash import fingerprint_issue
+from resolve.models import Issue
+
+
+class Command(BaseCommand):
+    help = 'Compute perceptual hashes for issue photos that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute hashes for every issue with a photo')
+
+    def handle(self, *args, **options):
+        issues = Issue.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            issues = issues.filter(image_fingerprint__isnull=True)
+
+        hashed = skipped = 0
+        for issue in issues.iterator():
+            if fingerprint_issue(issue) is None:
+                skipped += 1
+            else:
+                hashed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Hashed {hashed} photos'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {skipped} unreadable photos'))
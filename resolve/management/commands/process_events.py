@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resolve.events import get_consumers, rebuild_consumer, run_consumer
+
+
+class Command(BaseCommand):
+    help = 'Feed new issue events to the configured event consumers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', action='append', dest='consumers',
+                            help='Only run the named consumer (repeatable)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Reset the consumers and replay the whole event log')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--every', type=float,
+                            help='Keep running, polling for new events every this many seconds')
+
+    def handle(self, *args, **options):
+        consumers = get_consumers()
+        if options['consumers']:
+            consumers = [c for c in consumers if c.name in options['consumers']]
+            unknown = set(options['consumers']) - {c.name for c in consumers}
+            if unknown:
+                raise CommandError(f'Unknown consumer(s): {", ".join(sorted(unknown))}')
+
+        if options['rebuild']:
+            for consumer in consumers:
+                handled = rebuild_consumer(consumer, options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt {consumer.name} from {handled} events'))
+
+        while True:
+            for consumer in consumers:
+                handled = run_consumer(consumer, options['batch_size'])
+                if handled:
+                    self.stdout.write(f'{consumer.name}: handled {handled} events')
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary into the file-based replicas in REPLICA_DATABASES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replicas to refresh (default: all)')
+
+    def handle(self, *args, **options):
+        replicas = options['aliases'] or getattr(settings, 'REPLICA_DATABASES', [])
+        if not replicas:
+            raise CommandError('No replicas configured in REPLICA_DATABASES')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite primaries can be copied; use database replication instead')
+        primary.ensure_connection()
+
+        for alias in replicas:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not an SQLite database')
+            connections[alias].close()
+            # The online backup API copies a consistent snapshot while the
+            # primary keeps serving writes
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'Copied {DEFAULT_DB_ALIAS} to {alias}'))
@@ -0,0 +1,255 @@
+"""
+Request metrics in the Prometheus text format.
+
+MetricsMiddleware records, for each view, the latency, number and duration
+of database queries, template render time and response size of every
+request; websocket consumers mixing in InstrumentedConsumer record the
+same for every frame they receive, plus connections and frames sent, and
+the channel layers in resolve.channel_layers record group sizes, send
+latency and dropped messages. Series are plain counters held by the
+process, so recording one costs a lock and a few additions, and each
+worker process reports its own numbers at /metrics/, like cache_stats().
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from .caching import cache_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+GROUP_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+# Label for requests that matched no URL pattern, so 404 probes for random
+# paths don't create a series each
+UNRESOLVED = '<unresolved>'
+
+# What the current request or websocket frame spent: [queries, query seconds, template seconds]
+_usage = ContextVar('metrics_usage', default=None)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        yield f'{self.name}{_labels(self.labels, key)} {value}'
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket plus +Inf, then the sum of observations
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self, key, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), value):
+            cumulative += count
+            le = f'le="{bound}"'
+            yield f'{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}'
+        yield f'{self.name}_sum{_labels(self.labels, key)} {value[-1]}'
+        yield f'{self.name}_count{_labels(self.labels, key)} {cumulative}'
+
+
+http_requests = Counter('http_requests_total', 'HTTP requests served', ['view', 'method', 'status'])
+http_duration = Histogram('http_request_duration_seconds', 'Time to serve a request', ['view'])
+http_queries = Histogram('http_request_queries', 'Database queries per request', ['view'], QUERY_BUCKETS)
+http_query_time = Histogram('http_request_query_seconds', 'Time spent in database queries per request', ['view'])
+http_template_time = Histogram('http_request_template_seconds', 'Time spent rendering templates per request', ['view'])
+http_response_size = Histogram('http_response_size_bytes', 'Response body size', ['view'], SIZE_BUCKETS)
+
+ws_duration = Histogram('websocket_message_duration_seconds', 'Time to handle a received websocket frame', ['consumer'])
+ws_queries = Histogram('websocket_message_queries', 'Database queries per received websocket frame',
+                       ['consumer'], QUERY_BUCKETS)
+ws_query_time = Histogram('websocket_message_query_seconds',
+                          'Time spent in database queries per received websocket frame', ['consumer'])
+ws_connects = Counter('websocket_connects_total', 'Websocket connections accepted', ['consumer'])
+ws_disconnects = Counter('websocket_disconnects_total', 'Accepted websocket connections closed', ['consumer'])
+ws_open = Gauge('websocket_open_connections', 'Websocket connections currently open', ['consumer'])
+ws_received = Counter('websocket_messages_received_total', 'Websocket frames received', ['consumer'])
+ws_sent = Counter('websocket_messages_sent_total', 'Websocket frames sent', ['consumer'])
+
+group_size = Histogram('channel_group_size', 'Channels in a group at each group_send',
+                       ['group'], GROUP_BUCKETS)
+group_send_time = Histogram('channel_group_send_seconds', 'Time taken by group_send', ['group'])
+group_dropped = Counter('channel_messages_dropped_total',
+                        'Group messages dropped because a member channel was at capacity', ['group'])
+
+
+def group_kind(group):
+    """Group name without its id, e.g. "chat" for "chat_12", to keep label values few"""
+    kind, _, suffix = group.rpartition('_')
+    return kind if kind and suffix.isdigit() else group
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's usage"""
+    usage = _usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        usage[0] += 1
+        usage[1] += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver installing time_query on every connection"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def add_template_time(seconds):
+    usage = _usage.get()
+    if usage is not None:
+        usage[2] += seconds
+
+
+class MetricsMiddleware:
+    """
+    Records latency, queries, template time and response size per view.
+    Goes first in MIDDLEWARE so the time includes the other middleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        usage = [0, 0.0, 0.0]
+        token = _usage.set(usage)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _usage.reset(token)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        http_requests.inc(view, request.method, response.status_code)
+        http_duration.observe(elapsed, view)
+        http_queries.observe(usage[0], view)
+        http_query_time.observe(usage[1], view)
+        http_template_time.observe(usage[2], view)
+        if not response.streaming:
+            http_response_size.observe(int(response.get('Content-Length') or len(response.content)), view)
+        return response
+
+
+class InstrumentedConsumer:
+    """
+    Websocket consumer mixin counting connections and frames, and recording
+    time and queries per received frame
+    """
+    _accepted = False
+
+    async def accept(self, *args, **kwargs):
+        await super().accept(*args, **kwargs)
+        self._accepted = True
+        consumer = type(self).__name__
+        ws_connects.inc(consumer)
+        ws_open.inc(consumer)
+
+    async def websocket_disconnect(self, message):
+        if self._accepted:
+            self._accepted = False
+            consumer = type(self).__name__
+            ws_disconnects.inc(consumer)
+            ws_open.dec(consumer)
+        await super().websocket_disconnect(message)
+
+    async def send(self, *args, **kwargs):
+        await super().send(*args, **kwargs)
+        ws_sent.inc(type(self).__name__)
+
+    async def websocket_receive(self, message):
+        ws_received.inc(type(self).__name__)
+        usage = [0, 0.0, 0.0]
+        token = _usage.set(usage)
+        started = time.perf_counter()
+        try:
+            await super().websocket_receive(message)
+        finally:
+            _usage.reset(token)
+            consumer = type(self).__name__
+            ws_duration.observe(time.perf_counter() - started, consumer)
+            ws_queries.observe(usage[0], consumer)
+            ws_query_time.observe(usage[1], consumer)
+
+
+def _cache_lines():
+    lines = ['# HELP cache_lookups_total Versioned cache lookups', '# TYPE cache_lookups_total counter']
+    for name, entry in sorted(cache_stats().items()):
+        for result in ('hits', 'misses'):
+            lines.append(f'cache_lookups_total{_labels(("name", "result"), (name, result))} {entry[result]}')
+    return lines
+
+
+def render_metrics():
+    """All metrics of this process in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    lines.extend(_cache_lines())
+    return '\n'.join(lines) + '\n'
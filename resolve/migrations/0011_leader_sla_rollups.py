@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0010_issue_event_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='leader_resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='user_confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='LeaderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('opened', models.IntegerField(default=0)),
+                ('resolved', models.IntegerField(default=0)),
+                ('confirmed', models.IntegerField(default=0)),
+                ('resolve_time_sketch', models.JSONField(blank=True, default=dict)),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='resolve.leader')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('leader', 'day'), name='unique_leader_day_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+from resolve.duplicates import text_signature
+from resolve.geo import cell_id
+
+
+def backfill_search_fields(apps, schema_editor):
+    Issue = apps.get_model('resolve', 'Issue')
+    issues = list(Issue.objects.only('id', 'title', 'description', 'latitude', 'longitude'))
+    for issue in issues:
+        issue.geo_cell = cell_id(issue.latitude, issue.longitude)
+        issue.text_signature = text_signature(f'{issue.title} {issue.description}')
+    Issue.objects.bulk_update(issues, ['geo_cell', 'text_signature'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0011_leader_sla_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='text_signature',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['geo_cell', 'status'], name='issue_geo_cell_status_idx'),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0013_image_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leader',
+            name='solved_problems',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='LeaderScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'This Week'), ('month', 'This Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('solved', models.IntegerField(default=0)),
+                ('leader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='resolve.leader')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'period_start', '-solved'], name='leader_score_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('leader', 'period', 'period_start'), name='unique_leader_period_score')],
+            },
+        ),
+    ]
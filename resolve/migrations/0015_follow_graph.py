@@ -0,0 +1,84 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def copy_followers(apps, schema_editor):
+    CitizenProfile = apps.get_model('resolve', 'CitizenProfile')
+    Follow = apps.get_model('resolve', 'Follow')
+    # The auto-created table links the followed profile (from) to its follower (to)
+    links = CitizenProfile.followers.through.objects.exclude(
+        from_citizenprofile_id=models.F('to_citizenprofile_id')
+    ).values_list('from_citizenprofile_id', 'to_citizenprofile_id')
+    Follow.objects.bulk_create(
+        [Follow(followee_id=followee_id, follower_id=follower_id) for followee_id, follower_id in links],
+        batch_size=500
+    )
+
+
+def backfill_follow_totals(apps, schema_editor):
+    CitizenProfile = apps.get_model('resolve', 'CitizenProfile')
+    Follow = apps.get_model('resolve', 'Follow')
+    for profile_id, total in Follow.objects.values_list('followee').annotate(total=Count('id')):
+        CitizenProfile.objects.filter(pk=profile_id).update(followers_total=total)
+    for profile_id, total in Follow.objects.values_list('follower').annotate(total=Count('id')):
+        CitizenProfile.objects.filter(pk=profile_id).update(following_total=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0014_leader_period_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citizenprofile',
+            name='followers_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='citizenprofile',
+            name='following_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_links', to='resolve.citizenprofile')),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_links', to='resolve.citizenprofile')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        # Adding a through model can't be done in place: copy the rows into
+        # Follow, then swap the old field for one backed by it
+        migrations.RunPython(copy_followers, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='citizenprofile',
+            name='followers',
+        ),
+        migrations.AddField(
+            model_name='citizenprofile',
+            name='followers',
+            field=models.ManyToManyField(related_name='following', through='resolve.Follow', through_fields=('followee', 'follower'), to='resolve.citizenprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followee', '-created_at'], name='follow_followee_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('follower', 'followee'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(condition=models.Q(('follower', models.F('followee')), _negated=True), name='no_self_follow'),
+        ),
+        migrations.RunPython(backfill_follow_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from resolve.geo import cell_id
+
+
+def backfill_home_cells(apps, schema_editor):
+    CitizenProfile = apps.get_model('resolve', 'CitizenProfile')
+    profiles = list(CitizenProfile.objects.filter(
+        hometown_latitude__isnull=False, hometown_longitude__isnull=False
+    ).only('id', 'hometown_latitude', 'hometown_longitude'))
+    for profile in profiles:
+        profile.home_cell = cell_id(profile.hometown_latitude, profile.hometown_longitude)
+    CitizenProfile.objects.bulk_update(profiles, ['home_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0015_follow_graph'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recommendation', serialize=False, to='resolve.citizenprofile')),
+                ('people', models.JSONField(blank=True, default=list)),
+                ('issues', models.JSONField(blank=True, default=list)),
+                ('home_cell', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('stale', models.BooleanField(db_index=True, default=False)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='citizenprofile',
+            name='home_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_home_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0016_recommendations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'created_at'], name='chat_message_room_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['-created_at'], name='issue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['status', '-created_at'], name='issue_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['user', '-created_at'], name='issue_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at'], name='notification_recipient_idx'),
+        ),
+        # The auto-created hashtags table is only indexed for issue -> hashtags
+        # lookups; a hashtag page reads it the other way round
+        migrations.RunSQL(
+            'CREATE INDEX issue_hashtags_hashtag_issue_idx ON resolve_issue_hashtags (hashtag_id, issue_id)',
+            reverse_sql='DROP INDEX issue_hashtags_hashtag_issue_idx',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0017_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='citizenprofile',
+            name='hometown_latitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='citizenprofile',
+            name='hometown_longitude',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='latitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='longitude',
+            field=models.FloatField(),
+        ),
+    ]
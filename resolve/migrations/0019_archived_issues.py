@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0018_float_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedIssue',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('image', models.ImageField(blank=True, null=True, upload_to='issue_images/')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('geo_cell', models.BigIntegerField(blank=True, null=True)),
+                ('comments', models.JSONField(blank=True, default=list)),
+                ('flag_count', models.IntegerField(default=0)),
+                ('leader_resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('user_confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('bookmarks', models.ManyToManyField(blank=True, related_name='bookmarked_archived_issues', to=settings.AUTH_USER_MODEL)),
+                ('hashtags', models.ManyToManyField(blank=True, related_name='archived_issues', to='resolve.hashtag')),
+                ('leader_tagged', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_issues', to='resolve.leader')),
+                ('likes', models.ManyToManyField(blank=True, related_name='liked_archived_issues', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_issues', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='archived_issue_user_idx')],
+            },
+        ),
+    ]
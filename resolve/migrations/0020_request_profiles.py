@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0019_archived_issues'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('http', 'HTTP request'), ('websocket', 'Websocket frame')], max_length=10)),
+                ('target', models.CharField(max_length=500)),
+                ('method', models.CharField(blank=True, max_length=10)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('duration', models.FloatField(help_text='Seconds')),
+                ('sample_count', models.IntegerField(default=0)),
+                ('stacks', models.TextField(blank=True)),
+                ('queries', models.JSONField(blank=True, default=list)),
+                ('query_count', models.IntegerField(default=0)),
+                ('query_time', models.FloatField(default=0, help_text='Seconds')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='request_profiles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_actors(apps, schema_editor):
+    # Only the names still listed on a notification are known; older actors
+    # stay counted in actor_count but can count again if they come back
+    Notification = apps.get_model('resolve', 'Notification')
+    NotificationActor = apps.get_model('resolve', 'NotificationActor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    aggregated = Notification.objects.filter(bucket__isnull=False).values_list('id', 'sender_id', 'recent_actors')
+    for notification_id, sender_id, names in aggregated.iterator():
+        user_ids = {sender_id, *User.objects.filter(username__in=names).values_list('id', flat=True)}
+        NotificationActor.objects.bulk_create(
+            [NotificationActor(notification_id=notification_id, user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0020_request_profiles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='resolve.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('notification', 'user'), name='unique_notification_actor')],
+            },
+        ),
+        migrations.RunPython(backfill_actors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0021_notification_actors'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('follow', 'New Follower'), ('like', 'New Like'), ('comment', 'New Comment'), ('reply', 'New Reply'), ('mention', 'Mention'), ('issue_update', 'Issue Update'), ('status_change', 'Status Change'), ('message', 'New Message')], max_length=20),
+        ),
+    ]
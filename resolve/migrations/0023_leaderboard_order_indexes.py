@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resolve', '0022_notification_reply_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='leaderscore',
+            name='leader_score_rank_idx',
+        ),
+        migrations.AlterField(
+            model_name='leader',
+            name='solved_problems',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='leader',
+            index=models.Index(fields=['-solved_problems', 'id'], name='leader_solved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderdailystats',
+            index=models.Index(fields=['-day'], name='leader_stats_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderscore',
+            index=models.Index(fields=['period', 'period_start', '-solved', 'leader'], name='leader_score_rank_idx'),
+        ),
+    ]
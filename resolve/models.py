@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from . import caching
+from .duplicates import text_signature
+from .geo import cell_id
+
 
 class Leader(models.Model):
     name = models.CharField(max_length=100)
@@ -20,6 +24,10 @@ class Leader(models.Model):
 
     class Meta:
         ordering = ['-solved_problems']
+        indexes = [
+            # The all-time board's order, ties broken by id
+            models.Index(fields=['-solved_problems', 'id'], name='leader_solved_idx'),
+        ]
 
 
 class CitizenProfile(models.Model):
@@ -29,10 +37,17 @@ class CitizenProfile(models.Model):
     profile_picture = models.ImageField(upload_to='citizen_profiles/', null=True, blank=True)
     bio = models.TextField(max_length=500, blank=True)
     website = models.URLField(blank=True)
-    hometown_latitude = models.DecimalField(max_digits=22, decimal_places=16, null=True)
-    hometown_longitude = models.DecimalField(max_digits=22, decimal_places=16, null=True)
+    # Degrees as native floats: ~1e-9 degree resolution, far finer than GPS
+    hometown_latitude = models.FloatField(null=True)
+    hometown_longitude = models.FloatField(null=True)
     hometown_name = models.CharField(max_length=200, null=True)
-    followers = models.ManyToManyField('self', symmetrical=False, related_name='following')
+    # Grid cell of the hometown (see resolve.geo), kept in step on save
+    home_cell = models.BigIntegerField(null=True, blank=True, db_index=True)
+    followers = models.ManyToManyField('self', symmetrical=False, related_name='following',
+                                       through='Follow', through_fields=('followee', 'follower'))
+    # Maintained by resolve.follows on follow/unfollow
+    followers_total = models.IntegerField(default=0)
+    following_total = models.IntegerField(default=0)
     is_verified = models.BooleanField(default=False)
     issues_resolved = models.IntegerField(default=0)
     reputation_score = models.IntegerField(default=0)
@@ -40,10 +55,10 @@ class CitizenProfile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def follower_count(self):
-        return self.followers.count()
+        return self.followers_total
 
     def following_count(self):
-        return CitizenProfile.objects.filter(followers=self).count()
+        return self.following_total
 
     def issue_count(self):
         return self.user.issues.count()
@@ -55,7 +70,24 @@ class CitizenProfile(models.Model):
         ordering = ['-created_at']
 
 
+class Follow(models.Model):
+    """One citizen following another"""
+    follower = models.ForeignKey(CitizenProfile, on_delete=models.CASCADE, related_name='following_links')
+    followee = models.ForeignKey(CitizenProfile, on_delete=models.CASCADE, related_name='follower_links')
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    def __str__(self):
+        return f"{self.follower} follows {self.followee}"
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('followee')), name='no_self_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['followee', '-created_at'], name='follow_followee_idx'),
+        ]
 
 
 class Hashtag(models.Model):
@@ -78,17 +110,22 @@ class Issue(models.Model):
     image = models.ImageField(upload_to='issue_images/', null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='issues')
     leader_tagged = models.ForeignKey(Leader, on_delete=models.CASCADE, related_name='tagged_issues')
-    latitude = models.DecimalField(max_digits=22, decimal_places=16)
+    latitude = models.FloatField()
     hashtags = models.ManyToManyField(Hashtag, related_name='issues', blank=True)
     likes = models.ManyToManyField(User, related_name='liked_issues', blank=True)
     bookmarks = models.ManyToManyField(User, related_name='bookmarked_issues', blank=True)
     is_edited = models.BooleanField(default=False)
     edited_at = models.DateTimeField(null=True, blank=True)
-    longitude = models.DecimalField(max_digits=22, decimal_places=16)
+    longitude = models.FloatField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     is_leader_resolved = models.BooleanField(default=False)
     is_user_confirmed = models.BooleanField(default=False)
+    leader_resolved_at = models.DateTimeField(null=True, blank=True)
+    user_confirmed_at = models.DateTimeField(null=True, blank=True)
     flag_count = models.IntegerField(default=0)
+    # Derived on save for duplicate detection, see resolve.geo and resolve.duplicates
+    geo_cell = models.BigIntegerField(null=True, blank=True)
+    text_signature = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -97,6 +134,12 @@ class Issue(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['geo_cell', 'status'], name='issue_geo_cell_status_idx'),
+            models.Index(fields=['-created_at'], name='issue_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='issue_status_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='issue_user_created_idx'),
+        ]
 
     @property
     def anonymous_user_id(self):
@@ -104,6 +147,97 @@ class Issue(models.Model):
         return str(self.user.id)[-4:]
 
 
+class ImageFingerprint(models.Model):
+    """
+    64-bit difference hash of an issue photo. The hash is also stored as
+    four 16-bit bands, each indexed, so near-duplicate lookups can use
+    exact index matches (see resolve.imagehash).
+    """
+    issue = models.OneToOneField(Issue, on_delete=models.CASCADE, primary_key=True,
+                                 related_name='image_fingerprint')
+    dhash = models.BigIntegerField()
+    band0 = models.IntegerField(db_index=True)
+    band1 = models.IntegerField(db_index=True)
+    band2 = models.IntegerField(db_index=True)
+    band3 = models.IntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Fingerprint {self.dhash & 0xFFFFFFFFFFFFFFFF:016x} for issue {self.issue_id}"
+
+
+class ArchivedIssue(models.Model):
+    """
+    A solved issue moved out of the hot Issue table (see resolve.issue_archive).
+    It keeps the original id, so links keep working, plus its likes,
+    bookmarks and hashtags; the comment thread is kept as a read-only snapshot.
+    """
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    image = models.ImageField(upload_to='issue_images/', null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_issues')
+    leader_tagged = models.ForeignKey(Leader, on_delete=models.CASCADE, related_name='archived_issues')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geo_cell = models.BigIntegerField(null=True, blank=True)
+    hashtags = models.ManyToManyField(Hashtag, related_name='archived_issues', blank=True)
+    likes = models.ManyToManyField(User, related_name='liked_archived_issues', blank=True)
+    bookmarks = models.ManyToManyField(User, related_name='bookmarked_archived_issues', blank=True)
+    # [{id, user_id, username, content, created_at, parent_id}, ...] oldest first
+    comments = models.JSONField(default=list, blank=True)
+    flag_count = models.IntegerField(default=0)
+    leader_resolved_at = models.DateTimeField(null=True, blank=True)
+    user_confirmed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    status = 'solved'
+    is_leader_resolved = True
+    is_user_confirmed = True
+
+    def __str__(self):
+        return f"{self.title} - Archived"
+
+    @property
+    def anonymous_user_id(self):
+        """Return last 4 characters of user ID for anonymous display"""
+        return str(self.user.id)[-4:]
+
+    def get_status_display(self):
+        return 'Solved'
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_issue_user_idx'),
+        ]
+
+
+class IssueFlag(models.Model):
+    """A single "unsolved" flag, at most one per issue per user or anonymous device"""
+    issue = models.ForeignKey(Issue, on_delete=models.CASCADE, related_name='flags')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='issue_flags')
+    device_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['issue', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='unique_issue_flag_per_user'
+            ),
+            models.UniqueConstraint(
+                fields=['issue', 'device_id'],
+                condition=models.Q(user__isnull=True),
+                name='unique_issue_flag_per_device'
+            ),
+        ]
+
+
 # Signal to automatically create CitizenProfile when User is created
 @receiver(post_save, sender=User)
 def create_citizen_profile(sender, instance, created, **kwargs):
@@ -121,6 +255,29 @@ def save_citizen_profile(sender, instance, **kwargs):
         instance.citizenprofile.save()
 
 
+@receiver(pre_delete, sender=CitizenProfile)
+def release_follow_totals(sender, instance, **kwargs):
+    """Deleting a profile cascades to its follows; keep the other side's counters right"""
+    CitizenProfile.objects.filter(follower_links__follower=instance).update(
+        followers_total=models.F('followers_total') - 1
+    )
+    CitizenProfile.objects.filter(following_links__followee=instance).update(
+        following_total=models.F('following_total') - 1
+    )
+
+
+@receiver(pre_save, sender=CitizenProfile)
+def set_profile_home_cell(sender, instance, **kwargs):
+    instance.home_cell = cell_id(instance.hometown_latitude, instance.hometown_longitude)
+
+
+@receiver(pre_save, sender=Issue)
+def set_issue_search_fields(sender, instance, **kwargs):
+    """Keep the grid cell and MinHash signature in step with location and text"""
+    instance.geo_cell = cell_id(instance.latitude, instance.longitude)
+    instance.text_signature = text_signature(f'{instance.title} {instance.description}')
+
+
 class Comment(models.Model):
     issue = models.ForeignKey('Issue', on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -141,11 +298,62 @@ class Comment(models.Model):
         ordering = ['-created_at']
 
 
+# Cached results depend on entity versions (see resolve.caching); bump
+# them whenever a row is written. State changes made with UPDATE queries
+# are covered by record_event.
+@receiver([post_save, post_delete], sender=Issue)
+def invalidate_issue_cache(sender, instance, **kwargs):
+    caching.bump_on_commit(caching.ISSUE, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_issue_cache(sender, instance, **kwargs):
+    caching.bump_on_commit(caching.ISSUE, instance.issue_id)
+
+
+@receiver(m2m_changed, sender=Issue.hashtags.through)
+def invalidate_hashtag_cache(sender, instance, **kwargs):
+    if kwargs['action'].startswith('post_'):
+        caching.bump_on_commit(caching.HASHTAG)
+        caching.bump_on_commit(caching.ISSUE, instance.pk if isinstance(instance, Issue) else None)
+
+
+@receiver(m2m_changed, sender=Issue.bookmarks.through)
+def invalidate_bookmark_issue_cache(sender, instance, **kwargs):
+    # Bookmark counts are shown on cached issue cards
+    if kwargs['action'].startswith('post_'):
+        caching.bump_on_commit(caching.ISSUE, instance.pk if isinstance(instance, Issue) else None)
+
+
+@receiver([post_save, post_delete], sender=Hashtag)
+def invalidate_hashtag_row_cache(sender, instance, **kwargs):
+    caching.bump_on_commit(caching.HASHTAG, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Leader)
+def invalidate_leader_cache(sender, instance, **kwargs):
+    caching.bump_on_commit(caching.LEADER, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which nothing cached shows
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    caching.bump_on_commit(caching.USER, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=CitizenProfile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    caching.bump_on_commit(caching.USER, instance.user_id)
+
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('follow', 'New Follower'),
         ('like', 'New Like'),
         ('comment', 'New Comment'),
+        ('reply', 'New Reply'),
         ('mention', 'Mention'),
         ('issue_update', 'Issue Update'),
         ('status_change', 'Status Change'),
@@ -157,9 +365,216 @@ class Notification(models.Model):
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     issue = models.ForeignKey('Issue', on_delete=models.CASCADE, null=True, blank=True)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True)
+    # Set in place of `issue` when the issue is archived
+    archived_issue = models.ForeignKey(ArchivedIssue, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='notifications')
     text = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Aggregation: likes/comments on the same issue within a time bucket share one row
+    actor_count = models.IntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    bucket = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'notification_type', 'issue', 'bucket'],
+                name='unique_notification_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notification_unread_idx'),
+            models.Index(fields=['recipient', '-created_at'], name='notification_recipient_idx'),
+        ]
+
+    @property
+    def issue_link_id(self):
+        """Id to link the issue by; issue_detail serves live and archived issues alike"""
+        return self.issue_id or self.archived_issue_id
+
+
+class NotificationActor(models.Model):
+    """
+    A distinct sender folded into an aggregated notification, so actor_count
+    counts people rather than likes or comments
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'], name='unique_notification_actor'),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """Cached unread notification count per user, kept in step with Notification writes"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='notification_counter')
+    unread_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread_count} unread"
+
+
+@receiver(post_delete, sender=Notification)
+def discount_deleted_unread(sender, instance, **kwargs):
+    # Unread rows also disappear by cascade, when their issue, comment or
+    # sender is deleted. Only an existing counter is adjusted: a missing one
+    # is rebuilt by the next read, and the recipient may be going too.
+    if not instance.is_read:
+        NotificationCounter.objects.filter(user_id=instance.recipient_id).update(
+            unread_count=models.F('unread_count') - 1, updated_at=timezone.now()
+        )
+
+
+class IssueEvent(models.Model):
+    """
+    Append-only outbox of issue state changes. Rows are written in the same
+    transaction as the change and read in id order by EventConsumers.
+    """
+    EVENT_KINDS = [
+        ('created', 'Created'),
+        ('liked', 'Liked'),
+        ('unliked', 'Unliked'),
+        ('commented', 'Commented'),
+        ('resolved', 'Resolved by Leader'),
+        ('confirmed', 'Confirmed by User'),
+        ('flagged', 'Flagged'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=EVENT_KINDS)
+    # No database constraints so the log survives deletion of what it refers to
+    issue = models.ForeignKey(Issue, on_delete=models.DO_NOTHING, db_constraint=False,
+                              related_name='events')
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                              null=True, blank=True, related_name='+')
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} issue {self.issue_id}"
+
+    class Meta:
+        ordering = ['id']
+
+
+class LeaderDailyStats(models.Model):
+    """Per-leader, per-day rollup maintained from the IssueEvent log"""
+    leader = models.ForeignKey(Leader, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    opened = models.IntegerField(default=0)
+    resolved = models.IntegerField(default=0)
+    confirmed = models.IntegerField(default=0)
+    # Mergeable histogram of seconds from submission to leader resolution
+    resolve_time_sketch = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"{self.leader.name} on {self.day}"
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['leader', 'day'], name='unique_leader_day_stats'),
+        ]
+        indexes = [
+            # SLA windows read every leader's rows since a day
+            models.Index(fields=['-day'], name='leader_stats_day_idx'),
+        ]
+
+
+class LeaderScore(models.Model):
+    """
+    Issues a leader solved in one week or month, maintained from the
+    IssueEvent log. All-time counts live on Leader.solved_problems.
+    """
+    PERIOD_CHOICES = [
+        ('week', 'This Week'),
+        ('month', 'This Month'),
+    ]
+
+    leader = models.ForeignKey(Leader, on_delete=models.CASCADE, related_name='scores')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    solved = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.leader.name}: {self.solved} solved ({self.period} of {self.period_start})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leader', 'period', 'period_start'],
+                                    name='unique_leader_period_score'),
+        ]
+        indexes = [
+            # Top-N and rank lookups are range scans within one period, ties
+            # broken by leader
+            models.Index(fields=['period', 'period_start', '-solved', 'leader'], name='leader_score_rank_idx'),
+        ]
+
+
+class Recommendation(models.Model):
+    """
+    Precomputed "near you" suggestions for one citizen, built in batches by
+    resolve.recommendations. `people` holds [profile_id, reason] pairs and
+    `issues` holds issue ids, best first.
+    """
+    profile = models.OneToOneField(CitizenProfile, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='recommendation')
+    people = models.JSONField(default=list, blank=True)
+    issues = models.JSONField(default=list, blank=True)
+    # Home cell the suggestions were computed for; a moved hometown makes them stale
+    home_cell = models.BigIntegerField(null=True, blank=True, db_index=True)
+    stale = models.BooleanField(default=False, db_index=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations for {self.profile}"
+
+
+class EventCursor(models.Model):
+    """How far a named EventConsumer has read the IssueEvent log"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class RequestProfile(models.Model):
+    """
+    A request or websocket frame run under resolve.profiling at a staff
+    member's request: sampled call stacks in the collapsed format flame
+    graph tools read, plus every SQL query with its duration.
+    """
+    KINDS = [
+        ('http', 'HTTP request'),
+        ('websocket', 'Websocket frame'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # Path and query string, or the consumer class for websocket frames
+    target = models.CharField(max_length=500)
+    method = models.CharField(max_length=10, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='request_profiles')
+    duration = models.FloatField(help_text='Seconds')
+    sample_count = models.IntegerField(default=0)
+    # "frame;frame;frame count" lines, outermost frame first
+    stacks = models.TextField(blank=True)
+    # [{sql, seconds}, ...] in execution order
+    queries = models.JSONField(default=list, blank=True)
+    query_count = models.IntegerField(default=0)
+    query_time = models.FloatField(default=0, help_text='Seconds')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.target} ({self.duration * 1000:.0f} ms)"
 
     class Meta:
         ordering = ['-created_at']
@@ -198,4 +613,7 @@ class ChatMessage(models.Model):
         return f"{self.sender.username}: {self.content[:50]}"
 
     class Meta:
-        ordering = ['created_at']
\ No newline at end of file
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['room', 'created_at'], name='chat_message_room_created_idx'),
+        ]
\ No newline at end of file
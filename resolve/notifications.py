@@ -0,0 +1,290 @@
+import asyncio
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import SyncToAsync, async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Notification, NotificationActor, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+# Notification types that collapse into one row per (recipient, type, issue, bucket)
+AGGREGATED_TYPES = {'like', 'comment', 'reply'}
+
+# How many actor names are kept on an aggregated notification
+RECENT_ACTORS_LIMIT = 3
+
+
+def notification_group_name(user_id):
+    """Channel layer group joined by NotificationConsumer for a user"""
+    return f'notifications_{user_id}'
+
+
+def serialize_notification(notification):
+    """Build the websocket payload for a notification"""
+    return {
+        'notification_id': notification.id,
+        'notification_type': notification.notification_type,
+        'text': notification.text,
+        'sender_username': notification.sender.username,
+        'issue_id': notification.issue_link_id,
+        'comment_id': notification.comment_id,
+        'is_read': notification.is_read,
+        'actor_count': notification.actor_count,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def recount_unread(user_id):
+    """Rebuild a user's unread counter from the notification table"""
+    count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    NotificationCounter.objects.update_or_create(
+        user_id=user_id, defaults={'unread_count': count}
+    )
+    return count
+
+
+def _adjust_unread(user_id, delta):
+    """Atomically shift a user's unread counter, creating it from a recount if missing"""
+    # UPDATE skips auto_now, so updated_at is set by hand; it is the
+    # Last-Modified of the unread count endpoint
+    if delta and NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=F('unread_count') + delta, updated_at=timezone.now()
+    ):
+        return
+    if not NotificationCounter.objects.filter(user_id=user_id).exists():
+        # The recount already includes the rows written in this transaction
+        try:
+            with transaction.atomic():
+                recount_unread(user_id)
+        except IntegrityError:
+            NotificationCounter.objects.filter(user_id=user_id).update(
+                unread_count=F('unread_count') + delta, updated_at=timezone.now()
+            )
+
+
+def unread_count(user):
+    """Unread notifications for a user, read from the counter row"""
+    count = NotificationCounter.objects.filter(user=user).values_list(
+        'unread_count', flat=True
+    ).first()
+    if count is None:
+        count = recount_unread(user.id)
+    return count
+
+
+def mark_read(user, notification_id=None, up_to_id=None):
+    """
+    Mark a user's notifications read with a single UPDATE.
+
+    With `notification_id` only that notification is marked; with
+    `up_to_id` everything at or before that notification's time is marked;
+    with neither, all of them. Returns the number of rows changed.
+    """
+    notifications = Notification.objects.filter(recipient=user, is_read=False)
+    if notification_id is not None:
+        notifications = notifications.filter(pk=notification_id)
+    elif up_to_id is not None:
+        # Aggregated rows move forward in time, so "up to" is by time, not id
+        cutoff = Notification.objects.filter(recipient=user, pk=up_to_id).values('created_at')
+        notifications = notifications.filter(created_at__lte=Subquery(cutoff))
+
+    with transaction.atomic():
+        marked = notifications.update(is_read=True)
+        if marked:
+            _adjust_unread(user.id, -marked)
+    return marked
+
+
+class NotificationDispatcher:
+    """
+    Pushes notifications to the recipient's websocket group.
+
+    Payloads are buffered per recipient and flushed as a single
+    `notification.batch` frame every NOTIFICATION_PUSH_INTERVAL seconds,
+    so a burst of likes on a popular issue costs one group_send per
+    recipient instead of one per like.
+
+    Buffering and sending happen on the ASGI server's event loop, which
+    owns the channel layer's queues; the publishing thread only hands the
+    payload over. Outside an ASGI server (management commands, tests)
+    payloads are sent right away.
+    """
+
+    def __init__(self):
+        # Only touched from the event loop
+        self._pending = {}
+        self._handle = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'NOTIFICATION_PUSH_INTERVAL', 0.25)
+
+    def publish(self, recipient_id, payload):
+        """Queue a payload for delivery; repeated ids keep only the latest payload"""
+        loop = _server_loop()
+        if loop is None or self.interval <= 0:
+            self._send_now(recipient_id, [payload])
+            return
+        loop.call_soon_threadsafe(self._buffer, loop, recipient_id, payload)
+
+    def _buffer(self, loop, recipient_id, payload):
+        self._pending.setdefault(recipient_id, {})[payload['notification_id']] = payload
+        if self._handle is None:
+            self._handle = loop.call_later(self.interval, self.flush)
+
+    def flush(self):
+        """Send everything buffered so far, one frame per recipient; runs on the event loop"""
+        pending, self._pending = self._pending, {}
+        self._handle = None
+        for recipient_id, payloads in pending.items():
+            asyncio.ensure_future(self._send(recipient_id, list(payloads.values())))
+
+    def _send_now(self, recipient_id, payloads):
+        async_to_sync(self._send)(recipient_id, payloads)
+
+    async def _send(self, recipient_id, payloads):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            await channel_layer.group_send(
+                notification_group_name(recipient_id),
+                {
+                    'type': 'notification.batch',
+                    'notifications': payloads,
+                }
+            )
+        except Exception:
+            # Live delivery is best effort, the rows are already committed
+            logger.exception('Failed to push notifications to user %s', recipient_id)
+
+
+def _server_loop():
+    """
+    The event loop serving the current request, when called from sync code
+    the ASGI handler or a consumer runs through sync_to_async (asgiref
+    records it for async_to_sync in the same thread-local).
+    """
+    loop = getattr(SyncToAsync.threadlocal, 'main_event_loop', None)
+    if loop is None or loop.is_closed() or not loop.is_running():
+        return None
+    return loop
+
+
+dispatcher = NotificationDispatcher()
+
+
+def aggregation_bucket(when):
+    """Start of the NOTIFICATION_AGGREGATION_WINDOW bucket containing `when`"""
+    window = getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 6 * 60 * 60)
+    timestamp = int(when.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % window, tz=dt_timezone.utc)
+
+
+def format_notification_text(actors, actor_count, verb):
+    """Render e.g. "alice liked your issue." or "alice and 41 others liked your issue." """
+    if actor_count <= 1:
+        return f"{actors[0]} {verb}."
+    if actor_count == 2 and len(actors) >= 2:
+        return f"{actors[0]} and {actors[1]} {verb}."
+    others = actor_count - 1
+    return f"{actors[0]} and {others} other{'s' if others != 1 else ''} {verb}."
+
+
+def _upsert_aggregated(recipient, sender, notification_type, verb, issue, comment):
+    """Fold a like/comment into the recipient's notification for the current bucket"""
+    now = timezone.now()
+    bucket = aggregation_bucket(now)
+    lookup = {
+        'recipient': recipient,
+        'notification_type': notification_type,
+        'issue': issue,
+        'bucket': bucket,
+    }
+
+    with transaction.atomic():
+        notification = Notification.objects.select_for_update().filter(**lookup).first()
+        if notification is None:
+            try:
+                with transaction.atomic():
+                    notification = Notification.objects.create(
+                        sender=sender,
+                        comment=comment,
+                        text=format_notification_text([sender.username], 1, verb),
+                        recent_actors=[sender.username],
+                        **lookup
+                    )
+                    NotificationActor.objects.create(notification=notification, user=sender)
+                    _adjust_unread(recipient.id, 1)
+                    return notification
+            except IntegrityError:
+                # Another request created the bucket row first
+                notification = Notification.objects.select_for_update().get(**lookup)
+
+        # Repeat actors only move to the front of the names, they aren't counted twice
+        _, is_new_actor = NotificationActor.objects.get_or_create(notification=notification, user=sender)
+        actors = [sender.username] + [
+            name for name in notification.recent_actors if name != sender.username
+        ]
+        actors = actors[:RECENT_ACTORS_LIMIT]
+        actor_count = notification.actor_count + (1 if is_new_actor else 0)
+        text = format_notification_text(actors, actor_count, verb)
+
+        Notification.objects.filter(pk=notification.pk).update(
+            actor_count=F('actor_count') + (1 if is_new_actor else 0),
+            recent_actors=actors,
+            text=text,
+            sender=sender,
+            comment=comment,
+            is_read=False,
+            created_at=now
+        )
+        if notification.is_read:
+            _adjust_unread(recipient.id, 1)
+
+    notification.actor_count = actor_count
+    notification.recent_actors = actors
+    notification.text = text
+    notification.sender = sender
+    notification.comment = comment
+    notification.is_read = False
+    notification.created_at = now
+    return notification
+
+
+def notify(recipient, sender, notification_type, verb, issue=None, comment=None):
+    """
+    Create or aggregate a notification and push it to the recipient after
+    commit. `verb` completes the sentence, e.g. "liked your issue".
+    Returns None when the recipient is the sender.
+    """
+    if recipient == sender:
+        return None
+
+    if notification_type in AGGREGATED_TYPES and issue is not None:
+        notification = _upsert_aggregated(
+            recipient, sender, notification_type, verb, issue, comment
+        )
+    else:
+        with transaction.atomic():
+            notification = Notification.objects.create(
+                recipient=recipient,
+                sender=sender,
+                notification_type=notification_type,
+                issue=issue,
+                comment=comment,
+                text=format_notification_text([sender.username], 1, verb),
+                recent_actors=[sender.username]
+            )
+            _adjust_unread(recipient.id, 1)
+
+    payload = serialize_notification(notification)
+    payload['unread_count'] = unread_count(recipient)
+    transaction.on_commit(lambda: dispatcher.publish(recipient.id, payload))
+    return notification
@@ -0,0 +1,187 @@
+"""
+On-demand profiling of single requests.
+
+A staff member adds an "X-Profile" header or a "profile" query parameter to
+a request, or "?profile=1" to a websocket URL to profile every frame the
+socket receives. The request then runs with a sampling profiler that reads
+the stacks of the threads doing its work every PROFILER_SAMPLE_INTERVAL
+seconds, and every SQL query is recorded with its duration. The result is
+saved as a RequestProfile, viewed and downloaded from the admin.
+
+Threads are only sampled while they work for the profile: a request's
+thread until the response is ready, and worker threads while they run one
+of its queries. Websocket frames are handled on the event loop thread,
+which serves every other connection in between, so their profiles sample
+only the queries' threads.
+
+Requests that don't ask for a profile pay one header lookup, plus a
+context variable lookup per query.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import RequestProfile
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+
+_active = ContextVar('profile', default=None)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+class Profile:
+    """Samples the stacks of the threads serving one request until stopped"""
+
+    def __init__(self, kind, target, method='', user=None, sample_caller=True):
+        self.kind = kind
+        self.target = target[:500]
+        self.method = method
+        self.user = user if user is not None and user.is_authenticated else None
+        self.interval = getattr(settings, 'PROFILER_SAMPLE_INTERVAL', 0.005)
+        self.max_queries = getattr(settings, 'PROFILER_MAX_QUERIES', 1000)
+        # Threads whose stacks are sampled: the one serving the request, if
+        # it serves nothing else, and any running a query for it (see
+        # record_query)
+        self.threads = {threading.get_ident()} if sample_caller else set()
+        self.stacks = Counter()
+        self.samples = 0
+        self.queries = []
+        self.query_count = 0
+        self.query_time = 0.0
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name='request-profiler', daemon=True)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.query_time += seconds
+        if len(self.queries) < self.max_queries:
+            self.queries.append({'sql': sql, 'seconds': round(seconds, 6)})
+
+    def start(self):
+        self._token = _active.set(self)
+        self.started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self._stopped.set()
+        self._sampler.join()
+        _active.reset(self._token)
+
+    def save(self, status_code=None):
+        return RequestProfile.objects.create(
+            kind=self.kind,
+            target=self.target,
+            method=self.method,
+            status_code=status_code,
+            user=self.user,
+            duration=self.duration,
+            sample_count=self.samples,
+            stacks=''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common()),
+            queries=self.queries,
+            query_count=self.query_count,
+            query_time=self.query_time,
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the active profile"""
+    profile = _active.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    # A database_sync_to_async worker is shared with other requests, so it
+    # is sampled only while it runs this query
+    ident = threading.get_ident()
+    borrowed = ident not in profile.threads
+    if borrowed:
+        profile.threads.add(ident)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+        if borrowed:
+            profile.threads.discard(ident)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver installing record_query on every connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class ProfilerMiddleware:
+    """
+    Profiles requests from staff that ask for it and returns the saved
+    profile's id in an X-Profile-Id header. Goes after
+    AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (
+            (PROFILE_HEADER in request.headers or PROFILE_PARAM in request.GET)
+            and request.user.is_staff
+        ):
+            return self.get_response(request)
+
+        profile = Profile('http', request.get_full_path(), request.method, request.user)
+        profile.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        record = profile.save(status_code=response.status_code)
+        response['X-Profile-Id'] = str(record.pk)
+        return response
+
+
+class ProfiledConsumer:
+    """
+    Websocket consumer mixin profiling every received frame of sockets
+    opened by staff with ?profile=1.
+    """
+
+    async def websocket_receive(self, message):
+        user = self.scope.get('user')
+        if not (
+            user is not None and user.is_staff
+            and PROFILE_PARAM in parse_qs(self.scope.get('query_string', b'').decode())
+        ):
+            return await super().websocket_receive(message)
+
+        # The event loop thread runs other connections' frames meanwhile
+        profile = Profile('websocket', f"{type(self).__name__} {self.scope['path']}", user=user,
+                          sample_caller=False)
+        profile.start()
+        try:
+            await super().websocket_receive(message)
+        finally:
+            profile.stop()
+            await database_sync_to_async(profile.save)()
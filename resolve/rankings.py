@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .caching import ALL, LEADER, LEADERBOARD, bump, get_or_compute
+from .models import Leader, LeaderScore
+
+PERIODS = ['week', 'month', 'all']
+
+
+def period_start(period, day):
+    """First day of the week (Monday) or month containing `day`"""
+    if period == 'week':
+        return day - timezone.timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'Unknown period: {period}')
+
+
+def _period_scores(period, day=None):
+    day = day or timezone.localdate()
+    return LeaderScore.objects.filter(period=period, period_start=period_start(period, day))
+
+
+def top_leaders(period='all', limit=None, day=None):
+    """
+    Leaders ranked by issues solved in the period, each with a `score`
+    attribute. All-time rankings include leaders who solved nothing yet.
+    """
+    if period == 'all':
+        leaders = Leader.objects.select_related('user_account').order_by('-solved_problems', 'pk')
+        if limit is not None:
+            leaders = leaders[:limit]
+        leaders = list(leaders)
+        for leader in leaders:
+            leader.score = leader.solved_problems
+        return leaders
+
+    scores = _period_scores(period, day).select_related(
+        'leader__user_account'
+    ).order_by('-solved', 'leader_id')
+    if limit is not None:
+        scores = scores[:limit]
+    leaders = []
+    for score in scores:
+        score.leader.score = score.solved
+        leaders.append(score.leader)
+    return leaders
+
+
+def leader_rank(leader_id, period='all', day=None):
+    """
+    1-based rank of a leader in the period, or None if they solved nothing.
+    Tied leaders share a rank. The rank counts the leaders scoring higher
+    with a range scan of an index ordered by score, so it reads one index
+    entry per leader ranked above.
+    """
+    if period == 'all':
+        solved = Leader.objects.filter(pk=leader_id).values_list('solved_problems', flat=True).first()
+        if not solved:
+            return None
+        return Leader.objects.filter(solved_problems__gt=solved).count() + 1
+
+    scores = _period_scores(period, day)
+    solved = scores.filter(leader_id=leader_id).values_list('solved', flat=True).first()
+    if not solved:
+        return None
+    return scores.filter(solved__gt=solved).count() + 1
+
+
+def credit_period_scores(leader_id, day=None):
+    """
+    Count one solved issue towards a leader's week and month containing
+    `day`. Call inside the transaction that confirms the issue, as with
+    Leader.solved_problems.
+    """
+    day = day or timezone.localdate()
+    for period in ('week', 'month'):
+        score, created = LeaderScore.objects.get_or_create(
+            leader_id=leader_id, period=period, period_start=period_start(period, day),
+            defaults={'solved': 1}
+        )
+        if not created:
+            LeaderScore.objects.filter(pk=score.pk).update(solved=F('solved') + 1)
+
+
+def invalidate_leaderboard():
+    """Make every cached leaderboard fragment stale"""
+    bump(LEADERBOARD)
+
+
+def cached_leaderboard_html(name, template_name, build_context, period='all'):
+    """
+    Rendered leaderboard fragment, cached until the rankings or any leader
+    change, or a new week or month starts for a `period` board.
+    `build_context` is only called on a cache miss.
+    """
+    parts = () if period == 'all' else (period_start(period, timezone.localdate()).isoformat(),)
+    return get_or_compute(
+        f'leaderboard.{name}',
+        lambda: render_to_string(template_name, build_context()),
+        parts=parts,
+        depends_on=[(LEADERBOARD, ALL), (LEADER, ALL)],
+        timeout=getattr(settings, 'LEADERBOARD_CACHE_TIMEOUT', 300)
+    )
@@ -0,0 +1,191 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import geo
+from .events import EventConsumer
+from .models import CitizenProfile, Follow, Issue, Recommendation
+
+
+def _settings():
+    return (
+        getattr(settings, 'RECOMMENDATION_RADIUS_METERS', 3000),
+        getattr(settings, 'RECOMMENDATION_SIZE', 10),
+        getattr(settings, 'RECOMMENDATION_ACTIVITY_DAYS', 30),
+    )
+
+
+def _neighborhood(home_cell, radius, size, since):
+    """
+    Active citizens and trending unresolved issues around a home cell.
+    Every user in the cell shares this, so it is read once per cell.
+    """
+    latitude, longitude = geo.cell_center(home_cell)
+    cells = geo.cells_within(latitude, longitude, radius)
+
+    # Over-fetch so there is something left after removing the user's own entries
+    active = list(
+        CitizenProfile.objects.filter(home_cell__in=cells)
+        .annotate(recent_issues=Count('user__issues', filter=Q(user__issues__created_at__gte=since)))
+        .filter(recent_issues__gt=0)
+        .order_by('-recent_issues', 'pk')
+        .values_list('pk', 'recent_issues')[:size * 3]
+    )
+    trending = list(
+        Issue.objects.filter(
+            geo_cell__in=cells,
+            status__in=['open', 'pending_confirm'],
+            created_at__gte=since
+        )
+        .annotate(engagement=Count('likes', distinct=True) + Count('comments', distinct=True))
+        .order_by('-engagement', '-created_at')
+        .values_list('pk', 'user_id')[:size * 3]
+    )
+    return active, trending
+
+
+def compute_recommendations(profiles):
+    """
+    Build Recommendation rows for a batch of profiles with a home cell.
+
+    Follow edges and friends-of-friends are read with two queries for the
+    whole batch, and neighborhoods with two queries per distinct home
+    cell. The rows are written with a single upsert.
+    """
+    if not profiles:
+        return 0
+    radius, size, activity_days = _settings()
+    since = timezone.now() - timezone.timedelta(days=activity_days)
+
+    followees = defaultdict(set)
+    for follower_id, followee_id in Follow.objects.filter(
+        follower__in=profiles
+    ).values_list('follower_id', 'followee_id'):
+        followees[follower_id].add(followee_id)
+
+    second_degree = defaultdict(set)
+    for follower_id, followee_id in Follow.objects.filter(
+        follower_id__in=set().union(*followees.values())
+    ).values_list('follower_id', 'followee_id'):
+        second_degree[follower_id].add(followee_id)
+
+    neighborhoods = {
+        home_cell: _neighborhood(home_cell, radius, size, since)
+        for home_cell in {profile.home_cell for profile in profiles}
+    }
+
+    rows = []
+    for profile in profiles:
+        following = followees[profile.pk]
+        skip = following | {profile.pk}
+        active, trending = neighborhoods[profile.home_cell]
+
+        mutual = Counter(
+            candidate
+            for followee_id in following
+            for candidate in second_degree[followee_id]
+            if candidate not in skip
+        )
+        scores = {candidate: 2 * count for candidate, count in mutual.items()}
+        for candidate, recent_issues in active:
+            if candidate not in skip:
+                scores[candidate] = scores.get(candidate, 0) + recent_issues
+        people = sorted(scores, key=lambda candidate: (-scores[candidate], candidate))[:size]
+
+        rows.append(Recommendation(
+            profile=profile,
+            people=[[candidate, 'mutual' if candidate in mutual else 'nearby'] for candidate in people],
+            issues=[issue_id for issue_id, user_id in trending if user_id != profile.user_id][:size],
+            home_cell=profile.home_cell,
+            stale=False,
+        ))
+
+    Recommendation.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=['people', 'issues', 'home_cell', 'stale', 'computed_at'],
+    )
+    return len(rows)
+
+
+def refresh_recommendations(full=False, batch_size=500):
+    """
+    Recompute recommendations for profiles that have none, were marked
+    stale, or moved hometown since they were computed (or for everyone
+    with a hometown when `full`). Returns the number of profiles computed.
+    """
+    if full:
+        Recommendation.objects.update(stale=True)
+
+    # Computed profiles drop out of this filter, so each batch is a fresh
+    # first page. Sorting by cell keeps neighbours in the same batch, so
+    # they share neighborhood reads.
+    profiles = CitizenProfile.objects.filter(home_cell__isnull=False).filter(
+        Q(recommendation__isnull=True)
+        | Q(recommendation__stale=True)
+        | ~Q(recommendation__home_cell=F('home_cell'))
+    ).only('pk', 'user_id', 'home_cell').order_by('home_cell', 'pk')
+
+    computed = 0
+    while True:
+        batch = list(profiles[:batch_size])
+        if not batch:
+            break
+        computed += compute_recommendations(batch)
+    return computed
+
+
+def mark_stale_near(issue_ids):
+    """Flag the recommendations of everyone within reach of these issues"""
+    radius = _settings()[0]
+    cells = set()
+    for latitude, longitude in Issue.objects.filter(pk__in=issue_ids).values_list('latitude', 'longitude'):
+        cells.update(geo.cells_within(latitude, longitude, radius))
+    if cells:
+        Recommendation.objects.filter(home_cell__in=cells, stale=False).update(stale=True)
+
+
+def mark_stale_follow_graph(profile):
+    """A profile's follows changed: its suggestions and its followers' friends-of-friends are stale"""
+    Recommendation.objects.filter(
+        Q(profile=profile) | Q(profile__following_links__followee=profile),
+        stale=False
+    ).update(stale=True)
+
+
+def recommendations_for(profile):
+    """
+    (people, issues) suggested for a profile, from its precomputed row.
+    People carry a `reason` attribute ('mutual' or 'nearby').
+    """
+    recommendation = Recommendation.objects.filter(profile=profile).first()
+    if recommendation is None:
+        return [], []
+
+    reasons = dict(recommendation.people)
+    people_by_id = CitizenProfile.objects.select_related('user').in_bulk(list(reasons))
+    people = []
+    for profile_id, reason in recommendation.people:
+        person = people_by_id.get(profile_id)
+        if person is not None:
+            person.reason = reason
+            people.append(person)
+
+    issues_by_id = Issue.objects.select_related('user').in_bulk(recommendation.issues)
+    issues = [issues_by_id[issue_id] for issue_id in recommendation.issues if issue_id in issues_by_id]
+    return people, issues
+
+
+class RecommendationConsumer(EventConsumer):
+    """Marks suggestions stale around issues that were created, liked or commented on"""
+    name = 'recommendations'
+    kinds = ['created', 'liked', 'commented']
+
+    def handle(self, events):
+        mark_stale_near({event.issue_id for event in events})
+
+    def reset(self):
+        Recommendation.objects.update(stale=True)
@@ -0,0 +1,125 @@
+from array import array
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .events import EventConsumer
+from .models import ArchivedIssue, CitizenProfile, Issue
+
+DEFAULT_WEIGHTS = {
+    'resolved': 10,     # per issue the user reported that was confirmed solved
+    'likes': 2,         # per like received on the user's issues
+    'flags': -5,        # per community flag against the user's issues
+    'age_months': 1,    # per month since joining, up to MAX_AGE_MONTHS
+}
+MAX_AGE_MONTHS = 12
+
+
+def _grouped(queryset, user_field, value):
+    """{user_id: value} from a single GROUP BY query"""
+    return dict(queryset.values(user_field).annotate(value=value).values_list(user_field, 'value'))
+
+
+def _signal(user_index, counts):
+    """Align a {user_id: value} mapping to the positions in `user_index`"""
+    values = array('q', [0]) * len(user_index)
+    for user_id, value in counts.items():
+        values[user_index[user_id]] = value or 0
+    return values
+
+
+def score_profiles(profiles):
+    """
+    Compute issues_resolved and reputation_score for a batch of profiles.
+
+    Each signal is one grouped query over the batch, aligned into an array
+    per signal; the score is a weighted sum of the arrays. Returns the
+    profiles whose values changed, updated in memory but not saved.
+    """
+    if not profiles:
+        return []
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'REPUTATION_WEIGHTS', {})}
+    user_index = {profile.user_id: i for i, profile in enumerate(profiles)}
+    user_ids = list(user_index)
+    issues = Issue.objects.filter(user_id__in=user_ids)
+
+    resolved = _signal(user_index, _grouped(issues.filter(status='solved'), 'user', Count('id')))
+    likes = _signal(user_index, _grouped(
+        Issue.likes.through.objects.filter(issue__user_id__in=user_ids), 'issue__user', Count('id')
+    ))
+    flags = _signal(user_index, _grouped(issues.filter(flag_count__gt=0), 'user', Sum('flag_count')))
+
+    # Archived issues are all solved and keep their likes and flags
+    archived = ArchivedIssue.objects.filter(user_id__in=user_ids)
+    archived_resolved = _signal(user_index, _grouped(archived, 'user', Count('id')))
+    archived_likes = _signal(user_index, _grouped(
+        ArchivedIssue.likes.through.objects.filter(archivedissue__user_id__in=user_ids),
+        'archivedissue__user', Count('id')
+    ))
+    archived_flags = _signal(user_index, _grouped(archived.filter(flag_count__gt=0), 'user', Sum('flag_count')))
+
+    now = timezone.now()
+    age_months = array('q', (
+        min((now - profile.user.date_joined).days // 30, MAX_AGE_MONTHS)
+        for profile in profiles
+    ))
+
+    changed = []
+    for i, profile in enumerate(profiles):
+        resolved[i] += archived_resolved[i]
+        likes[i] += archived_likes[i]
+        flags[i] += archived_flags[i]
+        score = max(
+            weights['resolved'] * resolved[i]
+            + weights['likes'] * likes[i]
+            + weights['flags'] * flags[i]
+            + weights['age_months'] * age_months[i],
+            0
+        )
+        if profile.issues_resolved != resolved[i] or profile.reputation_score != score:
+            profile.issues_resolved = resolved[i]
+            profile.reputation_score = score
+            changed.append(profile)
+    return changed
+
+
+def update_reputation(user_ids=None, batch_size=500):
+    """
+    Recompute reputation for the given users, or for everyone when
+    `user_ids` is None, `batch_size` profiles at a time. Returns the
+    number of profiles whose values changed.
+    """
+    profiles = CitizenProfile.objects.select_related('user').only(
+        'pk', 'user_id', 'issues_resolved', 'reputation_score', 'user__date_joined'
+    ).order_by('pk')
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+
+    updated = 0
+    last_pk = 0
+    while True:
+        batch = list(profiles.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        changed = score_profiles(batch)
+        CitizenProfile.objects.bulk_update(changed, ['issues_resolved', 'reputation_score'])
+        updated += len(changed)
+    return updated
+
+
+class ReputationConsumer(EventConsumer):
+    """Rescores the owners of issues that were confirmed, liked or flagged"""
+    name = 'reputation'
+    kinds = ['confirmed', 'liked', 'unliked', 'flagged']
+
+    def handle(self, events):
+        owner_ids = {event.payload.get('owner_id') for event in events} - {None}
+        if owner_ids:
+            update_reputation(owner_ids)
+
+    def reset(self):
+        # Scores are recomputed from current state, so replaying only
+        # needs a full pass rather than a cleared table
+        update_reputation()
@@ -0,0 +1,87 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .events import record_event
+from .models import Issue, IssueFlag, Leader
+from .rankings import credit_period_scores, invalidate_leaderboard
+
+
+def resolve_by_leader(issue, leader):
+    """
+    Leader action: move an open issue to pending confirmation.
+
+    The transition is a single conditional UPDATE, so concurrent or repeated
+    requests can only succeed once. Returns True if this call made it.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        resolved = Issue.objects.filter(
+            pk=issue.pk, leader_tagged=leader, status='open'
+        ).update(
+            status='pending_confirm',
+            is_leader_resolved=True,
+            leader_resolved_at=now,
+            updated_at=now
+        )
+        if resolved:
+            record_event('resolved', issue, actor=leader.user_account,
+                         owner_id=issue.user_id, leader_id=leader.pk)
+    return bool(resolved)
+
+
+def confirm_by_user(issue, user):
+    """
+    User confirmation: move a pending issue to solved and credit the leader,
+    all time and for the current week and month.
+
+    Only the request whose conditional UPDATE changes the row increments
+    the leader's count, so the count can't be lost or doubled.
+    Returns True if this call made the transition.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        confirmed = Issue.objects.filter(
+            pk=issue.pk, user=user, status='pending_confirm'
+        ).update(
+            status='solved',
+            is_user_confirmed=True,
+            user_confirmed_at=now,
+            updated_at=now
+        )
+        if confirmed:
+            Leader.objects.filter(pk=issue.leader_tagged_id).update(
+                solved_problems=F('solved_problems') + 1
+            )
+            credit_period_scores(issue.leader_tagged_id, timezone.localtime(now).date())
+            record_event('confirmed', issue, actor=user,
+                         owner_id=issue.user_id, leader_id=issue.leader_tagged_id)
+            transaction.on_commit(invalidate_leaderboard)
+    return bool(confirmed)
+
+
+def flag_unsolved(issue, user=None, device_id=''):
+    """
+    Record a community flag against an issue.
+
+    Each user (or anonymous device) counts once: the unique index on
+    IssueFlag rejects repeats, and only a first flag bumps flag_count with
+    an UPDATE of that single column. Returns (flagged, flag_count).
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                IssueFlag.objects.create(
+                    issue=issue,
+                    user=user,
+                    device_id='' if user else device_id
+                )
+        except IntegrityError:
+            flagged = False
+        else:
+            flagged = True
+            Issue.objects.filter(pk=issue.pk).update(flag_count=F('flag_count') + 1)
+            record_event('flagged', issue, actor=user, owner_id=issue.user_id)
+
+    flag_count = Issue.objects.filter(pk=issue.pk).values_list('flag_count', flat=True).get()
+    return flagged, flag_count
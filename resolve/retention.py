@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+
+ARCHIVE_FIELDS = [
+    'id', 'recipient_id', 'sender_id', 'notification_type', 'issue_id', 'comment_id',
+    'archived_issue_id', 'text', 'actor_count', 'recent_actors', 'created_at',
+]
+
+
+def archive_file_path(archive_dir, created_at):
+    """Monthly archive file a notification belongs to"""
+    return Path(archive_dir) / f'notifications-{created_at:%Y-%m}.ndjson.gz'
+
+
+def append_archive_rows(archive_dir, rows):
+    """
+    Append rows as gzip-compressed NDJSON, one file per month.
+    Each call adds a new gzip member, so existing data is never rewritten.
+    """
+    by_file = {}
+    for row in rows:
+        by_file.setdefault(archive_file_path(archive_dir, row['created_at']), []).append(row)
+
+    Path(archive_dir).mkdir(parents=True, exist_ok=True)
+    for path, file_rows in by_file.items():
+        lines = ''.join(
+            json.dumps({**row, 'created_at': row['created_at'].isoformat()}) + '\n'
+            for row in file_rows
+        )
+        with open(path, 'ab') as archive:
+            archive.write(gzip.compress(lines.encode('utf-8')))
+            archive.flush()
+            os.fsync(archive.fileno())
+    return list(by_file)
+
+
+class ArchiveProgress:
+    """Running totals for an archival run"""
+
+    def __init__(self):
+        self.batches = 0
+        self.archived = 0
+        self.files = set()
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.archived / self.elapsed if self.elapsed else 0.0
+
+
+def archive_notifications(older_than_days=None, batch_size=None, archive_dir=None,
+                          max_batches=None, pause=0, progress_callback=None):
+    """
+    Move read notifications older than `older_than_days` into the archive.
+
+    Work is done in batches of `batch_size` rows. Each batch is one short
+    transaction: select the rows, append them to the archive, delete them
+    by primary key. The archive is fsynced before the delete commits, so a
+    crash can at worst leave a row in both places, never in neither.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000)
+    archive_dir = archive_dir or getattr(
+        settings, 'NOTIFICATION_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'notifications'
+    )
+    cutoff = timezone.now() - timezone.timedelta(days=older_than_days)
+    progress = ArchiveProgress()
+    last_id = 0
+
+    while max_batches is None or progress.batches < max_batches:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.select_for_update()
+                .filter(is_read=True, created_at__lt=cutoff, pk__gt=last_id)
+                .order_by('pk')
+                .values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+
+            progress.files.update(append_archive_rows(archive_dir, rows))
+            ids = [row['id'] for row in rows]
+            Notification.objects.filter(pk__in=ids).delete()
+
+        last_id = ids[-1]
+        progress.batches += 1
+        progress.archived += len(rows)
+        if progress_callback:
+            progress_callback(progress)
+        if pause:
+            # Give other writers a turn at the database between batches
+            time.sleep(pause)
+
+    return progress
+
+
+def read_archive(path):
+    """Yield archived notifications from one monthly archive file"""
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            yield json.loads(line)
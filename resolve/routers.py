@@ -0,0 +1,136 @@
+"""
+Read-replica routing.
+
+Reads go to the aliases in REPLICA_DATABASES only while serving a GET or
+HEAD request (see ReplicaPinningMiddleware); commands, event consumers and
+websocket handlers always use the primary. A request that writes, and the
+same client for REPLICA_PIN_SECONDS afterwards, reads from the primary so
+people see their own writes.
+"""
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'pin_primary'
+
+# A stale session logs people out, so sessions are always read from the primary
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_replicas_allowed = ContextVar('replicas_allowed', default=False)
+_wrote = ContextVar('wrote', default=None)
+_turn = itertools.count()
+_health = {}
+
+
+def _replicas():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def replica_healthy(alias):
+    """
+    Whether a replica answers queries, checked at most once every
+    REPLICA_HEALTH_INTERVAL seconds per process.
+    """
+    interval = getattr(settings, 'REPLICA_HEALTH_INTERVAL', 10)
+    checked_at, healthy = _health.get(alias, (None, False))
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < interval:
+        return healthy
+    try:
+        with connections[alias].cursor() as cursor:
+            # An empty or half-copied file has no migrations table
+            cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+        healthy = True
+    except DatabaseError:
+        logger.warning('Replica %s failed its health check', alias, exc_info=True)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside this block, e.g. for results that get cached"""
+    token = _replicas_allowed.set(False)
+    try:
+        yield
+    finally:
+        _replicas_allowed.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not _replicas_allowed.get()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        replicas = _replicas()
+        # Round-robin, skipping replicas that are down
+        start = next(_turn)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if replica_healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        wrote = _wrote.get()
+        if wrote is not None:
+            # Later reads in this request must see the write
+            wrote.append(model._meta.label)
+            _replicas_allowed.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, never migrated themselves
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Lets safe requests read from replicas, unless the client wrote within
+    the last REPLICA_PIN_SECONDS. Unsafe requests and requests that wrote
+    set a short-lived cookie pinning the client to the primary.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allowed = (
+            bool(_replicas())
+            and request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+        )
+        wrote = []
+        allowed_token = _replicas_allowed.set(allowed)
+        wrote_token = _wrote.set(wrote)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replicas_allowed.reset(allowed_token)
+            _wrote.reset(wrote_token)
+
+        if _replicas() and (wrote or request.method not in ('GET', 'HEAD', 'OPTIONS')):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax'
+            )
+        return response
@@ -1,3 +1,222 @@
-from django.test import TestCase
+import logging
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import ChatRoom, CitizenProfile, Hashtag, Issue, Leader
+
+logger = logging.getLogger(__name__)
+
+# A full scan of a table, as opposed to "SCAN t USING INDEX i" or "SEARCH t ..."
+TABLE_SCAN = re.compile(r'^SCAN (\w+)$')
+# Sorting the rows for ORDER BY, in full or past the index's leading columns
+SORT = re.compile(r'^USE TEMP B-TREE FOR (?:.* )?ORDER BY$')
+FROM_TABLE = re.compile(r' FROM "(\w+)"')
+
+
+def query_plan(sql):
+    """The detail column of SQLite's EXPLAIN QUERY PLAN for a captured query"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class QueryPlanTests(TestCase):
+    """
+    The queries each view runs must be served by an index. These fail when
+    a schema or query change makes one fall back to a table scan, or to
+    sorting rows an index already has in order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner')
+        CitizenProfile.objects.filter(user=cls.user).update(hometown_latitude=18.5, hometown_longitude=73.8)
+        leader = Leader.objects.create(name='Planner', designation='Mayor')
+        cls.issue = Issue.objects.create(
+            title='Pothole', description='Deep pothole', user=cls.user, leader_tagged=leader,
+            latitude=18.5, longitude=73.8
+        )
+        cls.issue.hashtags.add(Hashtag.objects.create(name='roads'))
+        ChatRoom.objects.create(creator=cls.user).participants.add(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertViewIndexed(self, url, ordered=(), scans=()):
+        """
+        EXPLAIN every SELECT the view at `url` runs with the caches empty.
+        Only the tables in `scans` may be read in full, and queries from the
+        tables in `ordered` must read rows in index order.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            plan = query_plan(sql)
+            table_scans = [
+                step for step in plan
+                if TABLE_SCAN.match(step) and TABLE_SCAN.match(step).group(1) not in scans
+            ]
+            self.assertFalse(table_scans, f'Table scan in plan: {plan}\n{sql}')
+            if FROM_TABLE.search(sql).group(1) in ordered:
+                sorts = [step for step in plan if SORT.match(step)]
+                self.assertFalse(sorts, f'Sort in plan: {plan}\n{sql}')
+
+    def test_home(self):
+        self.assertViewIndexed(reverse('home'), ordered={'resolve_leaderscore'})
+
+    def test_issue_feed(self):
+        self.assertViewIndexed(reverse('issue_feed'), ordered={'resolve_issue'})
+
+    def test_my_issues(self):
+        self.assertViewIndexed(reverse('my_issues'), ordered={'resolve_issue', 'resolve_archivedissue'})
+
+    def test_issue_detail(self):
+        self.assertViewIndexed(reverse('issue_detail', args=[self.issue.pk]))
+
+    def test_explore(self):
+        # Trending issues are sorted by engagement, which no index holds
+        self.assertViewIndexed(reverse('explore'))
+
+    def test_hashtag_view(self):
+        self.assertViewIndexed(reverse('hashtag_view', args=['roads']))
+
+    def test_activity_feed(self):
+        self.assertViewIndexed(reverse('activity_feed'), ordered={'resolve_notification'})
+
+    def test_chat(self):
+        # The page lists every other user to start a chat with
+        self.assertViewIndexed(reverse('chat_list'), scans={'auth_user'})
+
+    def test_leaderboard(self):
+        for period in ('all', 'week', 'month'):
+            with self.subTest(period=period):
+                self.assertViewIndexed(
+                    f"{reverse('leaderboard')}?period={period}",
+                    ordered={'resolve_leader', 'resolve_leaderscore', 'resolve_leaderdailystats'}
+                )
+
+    def test_check_duplicates(self):
+        self.assertViewIndexed(f"{reverse('check_duplicates')}?latitude=18.5&longitude=73.8&title=Pothole")
+
+
+class SerializedWriterTests(SimpleTestCase):
+    """
+    Stress test for resolve.backends.sqlite3 on a scratch database file:
+    writer threads run read-modify-write transactions and autocommit
+    inserts while reader threads poll, as chat consumers and views do
+    under Daphne.
+    """
+    alias = 'stress'
+    writers = 8
+    readers = 4
+    writes_per_thread = 50
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The test runner only knows the databases in settings, so the
+        # scratch one is registered and allowed after it has set up
+        cls.directory = tempfile.mkdtemp()
+        connections.settings[cls.alias] = connections.configure_settings({
+            'default': connections.settings['default'],
+            cls.alias: {
+                'ENGINE': 'resolve.backends.sqlite3',
+                'NAME': Path(cls.directory) / 'stress.sqlite3',
+                'OPTIONS': {'timeout': 20},
+            },
+        })[cls.alias]
+        cls.databases = cls.databases | {cls.alias}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.alias].close()
+        del connections[cls.alias]
+        del connections.settings[cls.alias]
+        cls.databases = cls.databases - {cls.alias}
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+            cursor.execute('CREATE TABLE entry (id INTEGER PRIMARY KEY, worker INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO counter VALUES (1, 0)')
+
+    def query(self, sql, params=()):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def test_concurrent_writes(self):
+        errors = []
+        reads = []
+        writing = threading.Event()
+        writing.set()
+
+        def write(worker):
+            try:
+                for _ in range(self.writes_per_thread):
+                    # Loses updates unless transactions are serialized
+                    with transaction.atomic(using=self.alias):
+                        [(value,)] = self.query('SELECT value FROM counter WHERE id = 1')
+                        self.query('UPDATE counter SET value = %s WHERE id = 1', [value + 1])
+                    self.query('INSERT INTO entry (worker) VALUES (%s)', [worker])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections[self.alias].close()
+
+        def read():
+            count = 0
+            try:
+                while writing.is_set():
+                    self.query('SELECT COUNT(*) FROM entry')
+                    count += 1
+            except Exception as error:
+                errors.append(error)
+            finally:
+                reads.append(count)
+                connections[self.alias].close()
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(self.writers)]
+        pollers = [threading.Thread(target=read) for _ in range(self.readers)]
+        started = time.perf_counter()
+        for thread in pollers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in pollers:
+            thread.join()
+
+        total = self.writers * self.writes_per_thread
+        logger.info(
+            'Serialized writer: %d transactions and %d inserts in %.2fs (%.0f writes/s), %d reads',
+            total, total, elapsed, 2 * total / elapsed, sum(reads)
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(self.query('SELECT value FROM counter WHERE id = 1'), [(total,)])
+        self.assertEqual(self.query('SELECT COUNT(*) FROM entry'), [(total,)])
+        self.assertEqual(self.query('PRAGMA journal_mode'), [('wal',)])
+        # Readers were never blocked by the writers
+        self.assertTrue(all(reads), reads)
@@ -15,18 +15,25 @@ urlpatterns = [
     path('signup/', views.signup, name='signup'),
     path('feed/', views.issue_feed, name='issue_feed'),
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/sla/', views.leader_sla_json, name='leader_sla_json'),
     path('submit/', views.submit_issue, name='submit_issue'),
+    path('submit/duplicates/', views.check_duplicates, name='check_duplicates'),
     path('resolve/<int:issue_id>/', views.leader_resolve, name='leader_resolve'),
     path('confirm/<int:issue_id>/', views.user_confirm, name='user_confirm'),
     path('flag/<int:issue_id>/', views.flag_issue, name='flag_issue'),
     path('my-issues/', views.my_issues, name='my_issues'),
+    path('issue/<int:issue_id>/', views.issue_detail, name='issue_detail'),
     
     # Social interaction URLs
     path('like/<int:issue_id>/', views.toggle_like, name='toggle_like'),
     path('bookmark/<int:issue_id>/', views.toggle_bookmark, name='toggle_bookmark'),
+    path('follow/<int:user_id>/', views.toggle_follow, name='toggle_follow'),
     path('comment/<int:issue_id>/', views.add_comment, name='add_comment'),
     path('reply/<int:comment_id>/', views.add_reply, name='add_reply'),
     path('tag/<str:tag_name>/', views.hashtag_view, name='hashtag_view'),
     path('activity/', views.activity_feed, name='activity_feed'),
+    path('notifications/unread/', views.notification_unread_count, name='notification_unread_count'),
+    path('notifications/mark-read/', views.mark_notifications_read, name='mark_notifications_read'),
     path('explore/', views.explore, name='explore'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
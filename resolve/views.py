@@ -1,23 +1,69 @@
+import hmac
+import math
+import uuid
+from itertools import chain
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from django.db.models import Q, Count, F
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import condition, require_POST
+from django.db import transaction
+from django.db.models import Q, Count, F, Prefetch
 from django.conf import settings
 from django.contrib.auth import login as auth_login
 from django.utils import timezone
-from django.db.models.functions import Power, Sqrt
-from .models import Issue, Leader, CitizenProfile, Comment, Hashtag, Notification
-from .forms import IssueForm, SignupForm, CommentForm, HashtagForm
+from django.utils.dateparse import parse_datetime
+from .models import ArchivedIssue, Issue, Leader, CitizenProfile, Comment, Hashtag, Notification
+from .forms import IssueForm, LocationForm, SignupForm, CommentForm, HashtagForm
 from .utils import process_hashtags, format_hashtags
+from .events import record_event
+from .notifications import mark_read, notify, unread_count
+from .resolution import confirm_by_user, flag_unsolved, resolve_by_leader
 from .ai_utils import check_content_safety
+from .caching import ALL, HASHTAG, ISSUE, USER, attach_card_versions, cached_result
+from .conditional import (
+    conditional_page, explore_etag, issue_feed_etag, leader_sla_last_modified,
+    leaderboard_etag, unread_count_last_modified
+)
+from .analytics import leader_sla
+from .rankings import cached_leaderboard_html, leader_rank, top_leaders
+from .duplicates import find_duplicates
+from .follows import annotate_followed, follow, unfollow
+from .imagehash import dhash, find_similar_images, save_fingerprint
+from .issue_archive import comment_snapshot
+from .metrics import render_metrics
+from .recommendations import recommendations_for
+
+# Days of daily rollups merged for the leaderboard's resolution times
+SLA_WINDOW_DAYS = 30
+
+# Most hot and archived issues listed for one search
+SEARCH_LIMIT = 50
+
+# Counts shown on cached issue cards. Everything a cached card shows is
+# fetched inside the cached computation, which reads from the primary, so a
+# card rendered later never reads lagging rows from a replica.
+CARD_TOTALS = {
+    'like_total': Count('likes', distinct=True),
+    'comment_total': Count('comments', distinct=True),
+}
+
+LEADERBOARD_PERIODS = {
+    'week': 'This Week',
+    'month': 'This Month',
+    'all': 'All Time',
+}
 
 
 def home(request):
     """Home page with links to main features"""
-    return render(request, 'resolve/home.html')
+    top_leaders_html = cached_leaderboard_html(
+        'home', 'resolve/home_top_leaders.html',
+        lambda: {'leaders': top_leaders('month', limit=3)},
+        period='month'
+    )
+    return render(request, 'resolve/home.html', {'top_leaders_html': top_leaders_html})
 
 
 def signup(request):
@@ -34,48 +80,101 @@ def signup(request):
     return render(request, 'resolve/signup.html', {'form': form})
 
 
-from django.db.models import F
-from django.db.models.functions import Power, Sqrt
+@cached_result('issue_feed', depends_on=[(ISSUE, ALL)])
+def _latest_issues():
+    """The feed as anonymous visitors and users without a hometown see it"""
+    return list(Issue.objects.select_related('user', 'leader_tagged').order_by('-created_at'))
+
 
+@conditional_page(issue_feed_etag)
 def issue_feed(request):
     """Display issues in a social media style feed with location-based recommendations"""
-    issues = Issue.objects.all()
+    issues = _latest_issues()
     
     # If user is authenticated and has hometown location set, sort by distance
     if request.user.is_authenticated:
-        try:
-            profile = CitizenProfile.objects.get(user=request.user)
-            if profile.hometown_latitude and profile.hometown_longitude:
-                # Calculate distance using the Pythagorean theorem
-                # This is a simplified distance calculation, good enough for sorting by relative distance
-                issues = issues.annotate(
-                    distance=Sqrt(
-                        Power(F('latitude') - profile.hometown_latitude, 2) +
-                        Power(F('longitude') - profile.hometown_longitude, 2)
-                    )
-                ).order_by('distance', '-created_at')
-            else:
-                issues = issues.order_by('-created_at')
-        except CitizenProfile.DoesNotExist:
-            issues = issues.order_by('-created_at')
-    else:
-        issues = issues.order_by('-created_at')
+        profile = CitizenProfile.objects.filter(user=request.user).first()
+        if profile and profile.hometown_latitude is not None and profile.hometown_longitude is not None:
+            # A simplified planar distance, good enough for sorting by relative
+            # distance. The cached rows are sorted rather than queried again
+            # so every card comes from the primary-read cache.
+            for issue in issues:
+                issue.distance = math.hypot(
+                    issue.latitude - profile.hometown_latitude,
+                    issue.longitude - profile.hometown_longitude
+                )
+            issues = sorted(issues, key=lambda issue: issue.distance)
     
+    # Cards are cached per issue version; only the distance and the
+    # viewer's action buttons are rendered per request
     context = {
-        'issues': issues
+        'issues': attach_card_versions(issues)
     }
     return render(request, 'resolve/issue_feed.html', context)
 
 
+@conditional_page(leaderboard_etag)
 def leaderboard(request):
-    """Display leaderboard of leaders sorted by solved problems"""
-    leaders = Leader.objects.all().order_by('-solved_problems')
+    """Display leaderboard of leaders sorted by problems solved this week, month or ever"""
+    period = request.GET.get('period', 'all')
+    if period not in LEADERBOARD_PERIODS:
+        period = 'all'
+    
+    period_label = LEADERBOARD_PERIODS[period] if period != 'all' else ''
+    
+    def build_context():
+        leaders = top_leaders(period)
+        
+        # Attach resolution time stats from the daily rollups
+        sla = leader_sla(days=SLA_WINDOW_DAYS)
+        for leader in leaders:
+            leader.sla = sla.get(leader.id)
+            if leader.sla:
+                for key in ('p50', 'p90'):
+                    seconds = leader.sla[key]
+                    leader.sla[f'{key}_hours'] = seconds / 3600 if seconds is not None else None
+        
+        return {
+            'leaders': leaders,
+            'period_label': period_label,
+            'sla_window_days': SLA_WINDOW_DAYS
+        }
+    
+    my_rank = None
+    if request.user.is_authenticated and hasattr(request.user, 'leader'):
+        my_rank = leader_rank(request.user.leader.pk, period)
+    
     context = {
-        'leaders': leaders
+        'period': period,
+        'periods': LEADERBOARD_PERIODS.items(),
+        'period_label': period_label,
+        'my_rank': my_rank,
+        'leaderboard_html': cached_leaderboard_html(
+            period, 'resolve/leaderboard_cards.html', build_context, period=period
+        )
     }
     return render(request, 'resolve/leaderboard.html', context)
 
 
+@condition(last_modified_func=leader_sla_last_modified)
+def leader_sla_json(request):
+    """Per-leader resolution stats over the last `days` days as JSON"""
+    try:
+        days = min(max(int(request.GET.get('days', SLA_WINDOW_DAYS)), 1), 365)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid days'}, status=400)
+    
+    sla = leader_sla(days=days)
+    leaders = Leader.objects.filter(id__in=sla).values('id', 'name', 'designation')
+    return JsonResponse({
+        'days': days,
+        'leaders': [
+            {**leader, **sla[leader['id']]}
+            for leader in leaders
+        ]
+    })
+
+
 @login_required
 def submit_issue(request):
     """Handle issue submission with AI content moderation"""
@@ -100,21 +199,51 @@ def submit_issue(request):
             issue.user = request.user
             
             # Get coordinates from hidden form fields
-            latitude = request.POST.get('latitude')
-            longitude = request.POST.get('longitude')
+            location = LocationForm(request.POST)
             
-            if latitude and longitude:
-                issue.latitude = float(latitude)
-                issue.longitude = float(longitude)
+            if location.is_valid():
+                issue.latitude = location.cleaned_data['latitude']
+                issue.longitude = location.cleaned_data['longitude']
             else:
                 messages.error(request, 'Please select a location on the map.')
                 return render(request, 'resolve/issue_submit.html', {'form': form})
             
-            issue.save()
+            image_hash = None
+            image = form.cleaned_data.get('image')
+            if image:
+                image_hash = dhash(image)
+                image.seek(0)
             
-            # Process hashtags in description
-            if description:
-                process_hashtags(description, issue)
+            # Offer to upvote an existing report instead of filing a duplicate
+            if not request.POST.get('ignore_duplicates'):
+                duplicates = find_duplicates(title, description, issue.latitude, issue.longitude)
+                photo_duplicates = []
+                if image_hash is not None:
+                    similar_ids = [issue_id for issue_id, _ in find_similar_images(image_hash)]
+                    photo_duplicates = Issue.objects.filter(
+                        pk__in=similar_ids, status__in=['open', 'pending_confirm']
+                    ).exclude(pk__in=[match[0].pk for match in duplicates])
+                if duplicates or photo_duplicates:
+                    return render(request, 'resolve/issue_submit.html', {
+                        'form': form,
+                        'duplicates': duplicates,
+                        'photo_duplicates': photo_duplicates,
+                        'latitude': issue.latitude,
+                        'longitude': issue.longitude
+                    })
+            
+            with transaction.atomic():
+                issue.save()
+                
+                if image_hash is not None:
+                    save_fingerprint(issue, image_hash)
+                
+                # Process hashtags in description
+                if description:
+                    process_hashtags(description, issue)
+                
+                record_event('created', issue, actor=request.user,
+                             owner_id=issue.user_id, leader_id=issue.leader_tagged_id)
             
             messages.success(request, 'Your issue has been submitted successfully!')
             return redirect('issue_feed')
@@ -123,29 +252,58 @@ def submit_issue(request):
     
     context = {
         'form': form,
-        'google_maps_key': settings.GOOGLE_MAPS_API_KEY
+        'google_maps_key': getattr(settings, 'GOOGLE_MAPS_API_KEY', None)
     }
     return render(request, 'resolve/issue_submit.html', context)
 
+
+@login_required
+def check_duplicates(request):
+    """Return open issues nearby that look like the one being written"""
+    location = LocationForm(request.GET)
+    if not location.is_valid():
+        return JsonResponse({'error': 'A valid latitude and longitude are required'}, status=400)
+    
+    duplicates = find_duplicates(
+        request.GET.get('title', ''),
+        request.GET.get('description', ''),
+        location.cleaned_data['latitude'],
+        location.cleaned_data['longitude']
+    )
+    return JsonResponse({
+        'duplicates': [
+            {
+                'id': issue.id,
+                'title': issue.title,
+                'status': issue.get_status_display(),
+                'distance_meters': round(distance),
+                'similarity': round(score, 2),
+            }
+            for issue, distance, score in duplicates
+        ]
+    })
+
 @login_required
 @require_POST
 def toggle_like(request, issue_id):
     """Toggle like status for an issue"""
     issue = get_object_or_404(Issue, id=issue_id)
-    if issue.likes.filter(id=request.user.id).exists():
-        issue.likes.remove(request.user)
-        liked = False
-    else:
-        issue.likes.add(request.user)
-        liked = True
-        if request.user != issue.user:
-            Notification.objects.create(
+    with transaction.atomic():
+        if issue.likes.filter(id=request.user.id).exists():
+            issue.likes.remove(request.user)
+            liked = False
+        else:
+            issue.likes.add(request.user)
+            liked = True
+            notify(
                 recipient=issue.user,
                 sender=request.user,
                 notification_type='like',
                 issue=issue,
-                text=f"{request.user.username} liked your issue."
+                verb='liked your issue'
             )
+        record_event('liked' if liked else 'unliked', issue, actor=request.user,
+                     owner_id=issue.user_id)
     return JsonResponse({
         'liked': liked,
         'like_count': issue.likes.count()
@@ -182,23 +340,25 @@ def add_comment(request, issue_id):
             content_safe = check_content_safety(comment.content)
             if content_safe == 'FALSE_OR_ABUSIVE':
                 messages.error(request, 'Your comment was flagged for potentially violating our community guidelines.')
-                return redirect('issue_detail', pk=issue_id)
+                return redirect('issue_detail', issue_id=issue_id)
             
-            comment.save()
-            
-            # Process hashtags in comment
-            process_hashtags(comment.content, issue)
-            
-            # Create notification
-            if request.user != issue.user:
-                Notification.objects.create(
+            with transaction.atomic():
+                comment.save()
+                
+                # Process hashtags in comment
+                process_hashtags(comment.content, issue)
+                
+                # Create notification
+                notify(
                     recipient=issue.user,
                     sender=request.user,
                     notification_type='comment',
                     issue=issue,
                     comment=comment,
-                    text=f"{request.user.username} commented on your issue."
+                    verb='commented on your issue'
                 )
+                record_event('commented', issue, actor=request.user,
+                             owner_id=issue.user_id, comment_id=comment.id)
             
             return JsonResponse({
                 'status': 'success',
@@ -225,20 +385,22 @@ def add_reply(request, comment_id):
             content_safe = check_content_safety(reply.content)
             if content_safe == 'FALSE_OR_ABUSIVE':
                 messages.error(request, 'Your reply was flagged for potentially violating our community guidelines.')
-                return redirect('issue_detail', pk=parent_comment.issue.id)
-            
-            reply.save()
+                return redirect('issue_detail', issue_id=parent_comment.issue.id)
             
-            # Create notification
-            if request.user != parent_comment.user:
-                Notification.objects.create(
+            with transaction.atomic():
+                reply.save()
+                
+                # Create notification
+                notify(
                     recipient=parent_comment.user,
                     sender=request.user,
-                    notification_type='comment',
+                    notification_type='reply',
                     issue=parent_comment.issue,
                     comment=reply,
-                    text=f"{request.user.username} replied to your comment."
+                    verb='replied to your comment'
                 )
+                record_event('commented', reply.issue, actor=request.user,
+                             owner_id=reply.issue.user_id, comment_id=reply.id)
             
             return JsonResponse({
                 'status': 'success',
@@ -249,11 +411,40 @@ def add_reply(request, comment_id):
             })
     return JsonResponse({'status': 'error'}, status=400)
 
+@cached_result('hashtag_issues', depends_on=[lambda hashtag_id: (HASHTAG, hashtag_id), (ISSUE, ALL)])
+def _hashtag_issues(hashtag_id):
+    return list(
+        Issue.objects.filter(hashtags=hashtag_id)
+        .select_related('user', 'leader_tagged')
+        .prefetch_related('hashtags', Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('user').prefetch_related(
+                Prefetch('replies', queryset=Comment.objects.select_related('user'))
+            )
+        ))
+        .annotate(**CARD_TOTALS, bookmark_total=Count('bookmarks', distinct=True))
+        .order_by('-created_at')
+    )
+
+
 @login_required
 def hashtag_view(request, tag_name):
     """Display issues with a specific hashtag"""
     hashtag = get_object_or_404(Hashtag, name=tag_name)
-    issues = Issue.objects.filter(hashtags=hashtag).order_by('-created_at')
+    issues = attach_card_versions(_hashtag_issues(hashtag.pk))
+    
+    # The viewer's like and bookmark state for every card in two queries
+    issue_ids = [issue.pk for issue in issues]
+    liked = set(Issue.likes.through.objects.filter(
+        user=request.user, issue_id__in=issue_ids
+    ).values_list('issue_id', flat=True))
+    bookmarked = set(Issue.bookmarks.through.objects.filter(
+        user=request.user, issue_id__in=issue_ids
+    ).values_list('issue_id', flat=True))
+    for issue in issues:
+        issue.is_liked = issue.pk in liked
+        issue.is_bookmarked = issue.pk in bookmarked
+    
     return render(request, 'resolve/hashtag_feed.html', {
         'hashtag': hashtag,
         'issues': issues
@@ -271,8 +462,9 @@ def leader_resolve(request, issue_id):
         return redirect('issue_feed')
     
     # Mark as resolved by leader
-    issue.is_leader_resolved = True
-    issue.save()
+    if not resolve_by_leader(issue, request.user.leader):
+        messages.error(request, 'This issue is not open for resolution.')
+        return redirect('issue_feed')
     
     messages.success(request, f'You have marked the issue "{issue.title}" as resolved. Waiting for user confirmation.')
     return redirect('issue_feed')
@@ -289,35 +481,114 @@ def user_confirm(request, issue_id):
         return redirect('issue_feed')
     
     # Mark as confirmed by user
-    issue.is_user_confirmed = True
-    issue.save()
+    if not confirm_by_user(issue, request.user):
+        messages.error(request, 'This issue is not awaiting your confirmation.')
+        return redirect('issue_feed')
     
     messages.success(request, f'Thank you for confirming that "{issue.title}" has been resolved!')
     return redirect('issue_feed')
 
 
 @require_POST
-@csrf_exempt
 def flag_issue(request, issue_id):
     """Allow users to flag an issue as unsolved"""
-    issue = get_object_or_404(Issue, id=issue_id)
-    issue.flag_count += 1
-    issue.save()
+    issue = get_object_or_404(Issue.objects.only('id', 'user'), id=issue_id)
     
-    return JsonResponse({
+    # Anonymous visitors are identified by a signed device cookie
+    device_id = ''
+    if not request.user.is_authenticated:
+        device_id = request.get_signed_cookie('device_id', default=None) or uuid.uuid4().hex
+    
+    flagged, flag_count = flag_unsolved(
+        issue,
+        user=request.user if request.user.is_authenticated else None,
+        device_id=device_id
+    )
+    
+    response = JsonResponse({
         'success': True,
-        'flag_count': issue.flag_count,
-        'message': 'Issue flagged successfully'
+        'flagged': flagged,
+        'flag_count': flag_count,
+        'message': 'Issue flagged successfully' if flagged else 'You have already flagged this issue'
+    })
+    if device_id:
+        response.set_signed_cookie('device_id', device_id, max_age=365 * 24 * 60 * 60, httponly=True)
+    return response
+
+
+@login_required
+@require_POST
+def toggle_follow(request, user_id):
+    """Follow or unfollow another citizen"""
+    profile = get_object_or_404(CitizenProfile, user_id=user_id)
+    viewer = get_object_or_404(CitizenProfile, user=request.user)
+    if profile.pk == viewer.pk:
+        return JsonResponse({'error': 'You cannot follow yourself'}, status=400)
+    
+    if unfollow(viewer, profile):
+        following = False
+    else:
+        following = follow(viewer, profile)
+    
+    profile.refresh_from_db(fields=['followers_total'])
+    return JsonResponse({
+        'following': following,
+        'follower_count': profile.follower_count()
     })
 
 
 @login_required
 def my_issues(request):
-    """Display user's own issues"""
-    issues = Issue.objects.filter(user=request.user).order_by('-created_at')
+    """Display user's own issues, including the ones that have been archived"""
+    issues = Issue.objects.filter(user=request.user).select_related('leader_tagged').order_by('-created_at')
+    archived_issues = ArchivedIssue.objects.filter(
+        user=request.user
+    ).select_related('leader_tagged').order_by('-created_at')
+    issues = sorted(chain(issues, archived_issues), key=lambda issue: issue.created_at, reverse=True)
     return render(request, 'resolve/my_issues.html', {'issues': issues})
 
 
+def _comment_thread(comments):
+    """Nest comment snapshots under the top-level comment they reply to"""
+    by_id = {}
+    roots = []
+    for comment in comments:
+        comment = dict(comment, created_at=parse_datetime(comment['created_at']), replies=[])
+        by_id[comment['id']] = comment
+        parent = by_id.get(comment['parent_id'])
+        if parent is None:
+            roots.append(comment)
+        else:
+            # Replies to replies are shown under the thread's first comment
+            while parent['parent_id'] in by_id:
+                parent = by_id[parent['parent_id']]
+            parent['replies'].append(comment)
+    return roots
+
+
+def issue_detail(request, issue_id):
+    """Display one issue, whether it is still live or has been archived"""
+    issue = Issue.objects.select_related('user', 'leader_tagged').filter(id=issue_id).first()
+    if issue is not None:
+        archived = False
+        comments = [
+            comment_snapshot(comment)
+            for comment in issue.comments.select_related('user').order_by('created_at', 'pk')
+        ]
+    else:
+        issue = get_object_or_404(ArchivedIssue.objects.select_related('user', 'leader_tagged'), id=issue_id)
+        archived = True
+        comments = issue.comments
+
+    return render(request, 'resolve/issue_detail.html', {
+        'issue': issue,
+        'archived': archived,
+        'hashtags': issue.hashtags.all(),
+        'like_total': issue.likes.count(),
+        'comments': _comment_thread(comments),
+    })
+
+
 @login_required
 def activity_feed(request):
     """Display user's activity feed and notifications"""
@@ -330,200 +601,128 @@ def activity_feed(request):
     seven_days_ago = timezone.now() - timezone.timedelta(days=7)
     
     trending_hashtags = Hashtag.objects.filter(
-        issue__created_at__gte=seven_days_ago
+        issues__created_at__gte=seven_days_ago
     ).annotate(
-        issue_count=Count('issue')
+        issue_count=Count('issues')
     ).order_by('-issue_count')[:10]
     
     return render(request, 'resolve/activity_feed.html', {
         'notifications': notifications,
+        'unread_count': unread_count(request.user),
         'trending_hashtags': trending_hashtags
     })
 
 
 @login_required
-def explore(request):
-    """Display explore page with trending and recent issues"""
+@condition(last_modified_func=unread_count_last_modified)
+def notification_unread_count(request):
+    """Return the unread notification count for the badge"""
+    return JsonResponse({'unread_count': unread_count(request.user)})
+
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    """Mark one notification, everything up to a notification, or all notifications as read"""
+    notification_id = request.POST.get('notification_id')
+    up_to_id = request.POST.get('up_to_id')
+    try:
+        marked = mark_read(
+            request.user,
+            notification_id=int(notification_id) if notification_id else None,
+            up_to_id=int(up_to_id) if up_to_id else None
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid notification id'}, status=400)
+
+    return JsonResponse({
+        'marked': marked,
+        'unread_count': unread_count(request.user)
+    })
+
+
+@cached_result('explore', depends_on=[(ISSUE, ALL), (HASHTAG, ALL), (USER, ALL)])
+def _explore_lists():
+    """The viewer-independent lists on explore"""
     seven_days_ago = timezone.now() - timezone.timedelta(days=7)
     
+    # Get trending issues (most likes and comments in the last 7 days)
+    trending_issues = list(Issue.objects.filter(
+        created_at__gte=seven_days_ago
+    ).annotate(
+        engagement_score=Count('likes') + Count('comments')
+    ).annotate(**CARD_TOTALS).select_related('user').prefetch_related('hashtags')
+     .order_by('-engagement_score')[:10])
+    
+    # Get recent issues
+    recent_issues = list(
+        Issue.objects.select_related('user').prefetch_related('hashtags')
+        .annotate(**CARD_TOTALS).order_by('-created_at')[:10]
+    )
+    
+    # Get trending hashtags
+    trending_hashtags = list(Hashtag.objects.filter(
+        issues__created_at__gte=seven_days_ago
+    ).annotate(
+        issue_count=Count('issues')
+    ).order_by('-issue_count')[:10])
+    
+    # Get most active users
+    active_users = list(CitizenProfile.objects.filter(
+        user__issues__created_at__gte=seven_days_ago
+    ).annotate(
+        issue_count=Count('user__issues')
+    ).select_related('user').order_by('-issue_count')[:10])
+    
+    return trending_issues, recent_issues, trending_hashtags, active_users
+
+
+@login_required
+@conditional_page(explore_etag)
+def explore(request):
+    """Display explore page with trending and recent issues"""
     # Handle search
     search_query = request.GET.get('q')
     if search_query:
-        # Search in title, description, and hashtags
-        issues = Issue.objects.filter(
+        # Search in title, description, and hashtags, including archived issues
+        matches = (
             Q(title__icontains=search_query) |
             Q(description__icontains=search_query) |
             Q(hashtags__name__icontains=search_query)
-        ).distinct().order_by('-created_at')
+        )
+        issues = Issue.objects.filter(matches).distinct().order_by('-created_at')[:SEARCH_LIMIT]
+        archived_issues = ArchivedIssue.objects.filter(matches).distinct().order_by('-created_at')[:SEARCH_LIMIT]
         return render(request, 'resolve/explore.html', {
             'issues': issues,
+            'archived_issues': archived_issues,
             'search_query': search_query
         })
     
-    # Get trending issues (most likes and comments in the last 7 days)
-    trending_issues = Issue.objects.filter(
-        created_at__gte=seven_days_ago
-    ).annotate(
-        engagement_score=Count('likes') + Count('comments')
-    ).order_by('-engagement_score')[:10]
+    trending_issues, recent_issues, trending_hashtags, active_users = _explore_lists()
+    attach_card_versions(trending_issues + recent_issues)
     
-    # Get recent issues
-    recent_issues = Issue.objects.order_by('-created_at')[:10]
+    # Precomputed "near you" suggestions, one row per citizen
+    viewer = getattr(request.user, 'citizen_profile', None) if request.user.is_authenticated else None
+    suggested_people, nearby_issues = recommendations_for(viewer) if viewer else ([], [])
     
-    # Get trending hashtags
-    trending_hashtags = Hashtag.objects.filter(
-        issue__created_at__gte=seven_days_ago
-    ).annotate(
-        issue_count=Count('issue')
-    ).order_by('-issue_count')[:10]
-    
-    # Get most active users
-    active_users = CitizenProfile.objects.filter(
-        user__issue__created_at__gte=seven_days_ago
-    ).annotate(
-        issue_count=Count('user__issue')
-    ).order_by('-issue_count')[:10]
+    # One query for the follow buttons of both lists
+    annotate_followed(viewer, active_users + suggested_people)
     
     return render(request, 'resolve/explore.html', {
         'trending_issues': trending_issues,
         'recent_issues': recent_issues,
         'trending_hashtags': trending_hashtags,
-        'active_users': active_users
-    })
-
-
-@login_required
-@require_POST
-def toggle_like(request, issue_id):
-    """Toggle like status for an issue"""
-    issue = get_object_or_404(Issue, id=issue_id)
-    if issue.likes.filter(id=request.user.id).exists():
-        issue.likes.remove(request.user)
-        liked = False
-    else:
-        issue.likes.add(request.user)
-        liked = True
-        if request.user != issue.user:
-            Notification.objects.create(
-                recipient=issue.user,
-                sender=request.user,
-                notification_type='like',
-                issue=issue,
-                text=f"{request.user.username} liked your issue."
-            )
-    return JsonResponse({
-        'liked': liked,
-        'like_count': issue.likes.count()
-    })
-
-
-@login_required
-@require_POST
-def toggle_bookmark(request, issue_id):
-    """Toggle bookmark status for an issue"""
-    issue = get_object_or_404(Issue, id=issue_id)
-    if issue.bookmarks.filter(id=request.user.id).exists():
-        issue.bookmarks.remove(request.user)
-        bookmarked = False
-    else:
-        issue.bookmarks.add(request.user)
-        bookmarked = True
-    return JsonResponse({
-        'bookmarked': bookmarked,
-        'bookmark_count': issue.bookmarks.count()
+        'active_users': active_users,
+        'suggested_people': suggested_people,
+        'nearby_issues': nearby_issues
     })
 
 
-@login_required
-def add_comment(request, issue_id):
-    """Add a comment to an issue"""
-    issue = get_object_or_404(Issue, id=issue_id)
-    if request.method == 'POST':
-        form = CommentForm(request.POST)
-        if form.is_valid():
-            comment = form.save(commit=False)
-            comment.user = request.user
-            comment.issue = issue
-            
-            # Check content safety
-            content_safe = check_content_safety(comment.content)
-            if content_safe == 'FALSE_OR_ABUSIVE':
-                messages.error(request, 'Your comment was flagged for potentially violating our community guidelines.')
-                return redirect('issue_detail', pk=issue_id)
-            
-            comment.save()
-            
-            # Process hashtags in comment
-            process_hashtags(comment.content, issue)
-            
-            # Create notification
-            if request.user != issue.user:
-                Notification.objects.create(
-                    recipient=issue.user,
-                    sender=request.user,
-                    notification_type='comment',
-                    issue=issue,
-                    comment=comment,
-                    text=f"{request.user.username} commented on your issue."
-                )
-            
-            return JsonResponse({
-                'status': 'success',
-                'comment_id': comment.id,
-                'username': request.user.username,
-                'content': format_hashtags(comment.content),
-                'created_at': comment.created_at.strftime('%b %d, %Y %H:%M')
-            })
-    return JsonResponse({'status': 'error'}, status=400)
-
-
-@login_required
-def add_reply(request, comment_id):
-    """Add a reply to a comment"""
-    parent_comment = get_object_or_404(Comment, id=comment_id)
-    if request.method == 'POST':
-        form = CommentForm(request.POST)
-        if form.is_valid():
-            reply = form.save(commit=False)
-            reply.user = request.user
-            reply.issue = parent_comment.issue
-            reply.parent = parent_comment
-            
-            # Check content safety
-            content_safe = check_content_safety(reply.content)
-            if content_safe == 'FALSE_OR_ABUSIVE':
-                messages.error(request, 'Your reply was flagged for potentially violating our community guidelines.')
-                return redirect('issue_detail', pk=parent_comment.issue.id)
-            
-            reply.save()
-            
-            # Create notification
-            if request.user != parent_comment.user:
-                Notification.objects.create(
-                    recipient=parent_comment.user,
-                    sender=request.user,
-                    notification_type='comment',
-                    issue=parent_comment.issue,
-                    comment=reply,
-                    text=f"{request.user.username} replied to your comment."
-                )
-            
-            return JsonResponse({
-                'status': 'success',
-                'reply_id': reply.id,
-                'username': request.user.username,
-                'content': format_hashtags(reply.content),
-                'created_at': reply.created_at.strftime('%b %d, %Y %H:%M')
-            })
-    return JsonResponse({'status': 'error'}, status=400)
-
-
-@login_required
-def hashtag_view(request, tag_name):
-    """Display issues with a specific hashtag"""
-    hashtag = get_object_or_404(Hashtag, name=tag_name)
-    issues = Issue.objects.filter(hashtags=hashtag).order_by('-created_at')
-    return render(request, 'resolve/hashtag_feed.html', {
-        'hashtag': hashtag,
-        'issues': issues
-    })
\ No newline at end of file
+def metrics(request):
+    """Request and cache metrics of this process in the Prometheus text format"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    scraper = bool(token) and hmac.compare_digest(authorization, f'Bearer {token}')
+    if not (scraper or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')